@@ -0,0 +1,333 @@
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from pandas import DataFrame
+from pandas.testing import assert_frame_equal
+import pytest
+import talib
+
+from vnpy.trader.constant import Direction, Exchange, Interval
+from vnpy.trader.object import BarData, TradeData
+from vnpy.trader.utility import BarGenerator
+
+from vnpy_ctastrategy import CtaTemplate, backtesting
+from vnpy_ctastrategy.backtesting import (
+    BacktestingEngine,
+    DailyResult,
+    LogBuffer,
+    calculate_daily_df
+)
+
+
+def create_trade(dt: datetime, direction: Direction, price: float, volume: float) -> TradeData:
+    """"""
+    return TradeData(
+        symbol="rb2405",
+        exchange=Exchange.SHFE,
+        orderid=str(dt),
+        tradeid=str(dt),
+        direction=direction,
+        price=price,
+        volume=volume,
+        datetime=dt,
+        gateway_name="BACKTESTING"
+    )
+
+
+def calculate_daily_results(
+    closes: dict[date, float],
+    trades: list[TradeData],
+    size: float,
+    rate: float,
+    slippage: float
+) -> list[DailyResult]:
+    """
+    Calculate daily results with DailyResult.calculate_pnl day by day.
+    """
+    daily_results: dict[date, DailyResult] = {d: DailyResult(d, price) for d, price in closes.items()}
+    for trade in trades:
+        daily_results[trade.datetime.date()].add_trade(trade)      # type: ignore
+
+    pre_close: float = 0
+    start_pos: float = 0
+
+    for daily_result in daily_results.values():
+        daily_result.calculate_pnl(pre_close, start_pos, size, rate, slippage)
+        pre_close = daily_result.close_price
+        start_pos = daily_result.end_pos
+
+    return list(daily_results.values())
+
+
+CLOSES: dict[date, float] = {
+    date(2024, 1, 2): 3900.0,
+    date(2024, 1, 3): 3910.0,
+    date(2024, 1, 4): 3905.0,
+    date(2024, 1, 5): 3920.0
+}
+
+
+def create_trades() -> list[TradeData]:
+    """"""
+    return [
+        create_trade(datetime(2024, 1, 2, 10), Direction.LONG, 3895, 2),
+        create_trade(datetime(2024, 1, 4, 10), Direction.SHORT, 3908, 1),
+        create_trade(datetime(2024, 1, 4, 14), Direction.SHORT, 3902, 1)
+    ]
+
+
+def test_daily_df_dtypes() -> None:
+    """
+    Daily DataFrame keeps int columns of day by day calculation.
+    """
+    closes: dict[date, float] = CLOSES
+    trades: list[TradeData] = create_trades()
+
+    daily_results: list[DailyResult] = calculate_daily_results(closes, trades, 10, 0, 1)
+    expected: DataFrame = DataFrame([r.__dict__ for r in daily_results]).set_index("date")
+
+    df: DataFrame = calculate_daily_df(
+        [DailyResult(d, price) for d, price in closes.items()],
+        trades,
+        10,
+        0,
+        1
+    )
+
+    assert_frame_equal(df, expected, check_exact=True)
+    assert df["slippage"].dtype.kind == "i"
+
+
+def test_all_daily_results() -> None:
+    """
+    Daily results are filled with DailyResult fields only.
+    """
+    trades: list[TradeData] = create_trades()
+
+    engine: BacktestingEngine = BacktestingEngine()
+    engine.output = lambda msg: None            # type: ignore
+    engine.capital = 1_000_000
+    engine.size = 10
+    engine.rate = 0
+    engine.slippage = 1
+    engine.daily_results = {d: DailyResult(d, price) for d, price in CLOSES.items()}
+    engine.trades = {trade.vt_tradeid: trade for trade in trades}
+
+    engine.calculate_result()
+    engine.calculate_statistics(output=False)
+
+    expected: list[DailyResult] = calculate_daily_results(CLOSES, trades, 10, 0, 1)
+    for daily_result, result in zip(engine.get_all_daily_results(), expected, strict=True):
+        assert daily_result.__dict__ == result.__dict__
+
+
+def write_logs(buffer: LogBuffer, count: int) -> None:
+    """"""
+    for i in range(count):
+        buffer.write(datetime(2024, 1, 2, 9, i), f"log {i}")
+
+
+def test_log_buffer() -> None:
+    """
+    Log records are formatted when read, by index or slice.
+    """
+    buffer: LogBuffer = LogBuffer()
+    write_logs(buffer, 5)
+
+    assert len(buffer) == 5
+    assert buffer[0] == "2024-01-02 09:00:00\tlog 0"
+    assert buffer[-1] == "2024-01-02 09:04:00\tlog 4"
+    assert buffer[-2:] == list(buffer)[3:]
+    assert buffer[::2] == buffer.get_logs()[::2]
+    assert buffer[10:] == []
+
+
+def test_log_buffer_size() -> None:
+    """
+    New records are dropped when full, or replace the oldest in ring mode.
+    """
+    buffer: LogBuffer = LogBuffer(3)
+    write_logs(buffer, 5)
+
+    assert [log[-5:] for log in buffer] == ["log 0", "log 1", "log 2"]
+    assert buffer.dropped == 2
+
+    ring_buffer: LogBuffer = LogBuffer(3, ring=True)
+    write_logs(ring_buffer, 5)
+
+    assert [log[-5:] for log in ring_buffer] == ["log 2", "log 3", "log 4"]
+    assert ring_buffer.dropped == 2
+
+    disabled_buffer: LogBuffer = LogBuffer(enabled=False)
+    write_logs(disabled_buffer, 5)
+
+    assert not len(disabled_buffer)
+
+
+START: datetime = datetime(2024, 1, 2, 9)
+TZ: ZoneInfo = ZoneInfo("Asia/Shanghai")
+
+
+def create_engine(
+    strategy_class: type[CtaTemplate],
+    setting: dict,
+    closes: np.ndarray,
+    use_cache: bool = False
+) -> BacktestingEngine:
+    """
+    Create engine with 1 minute bars of close prices as history data.
+    """
+    engine: BacktestingEngine = BacktestingEngine()
+    engine.output = lambda msg: None            # type: ignore
+    engine.set_parameters(
+        vt_symbol="rb2405.SHFE",
+        interval=Interval.MINUTE,
+        start=START,
+        end=START + timedelta(minutes=len(closes)),
+        rate=0,
+        slippage=0,
+        size=10,
+        pricetick=0.1,
+        capital=1_000_000,
+        use_cache=use_cache
+    )
+    engine.add_strategy(strategy_class, setting)
+
+    engine.history_data = [
+        BarData(
+            symbol="rb2405",
+            exchange=Exchange.SHFE,
+            datetime=START + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            open_price=price,
+            high_price=price,
+            low_price=price,
+            close_price=price,
+            gateway_name="DB"
+        )
+        for i, price in enumerate(closes)
+    ]
+    return engine
+
+
+class IndicatorStrategy(CtaTemplate):
+    """
+    Record indicator values of 1 minute bars and 15 minute window bars.
+    """
+
+    def on_init(self) -> None:
+        """"""
+        self.bg: BarGenerator = BarGenerator(self.on_bar, 15, self.on_15min_bar)
+
+        self.values: list = []
+        self.window_values: list = []
+
+    def on_bar(self, bar: BarData) -> None:
+        """"""
+        self.values.append(self.get_indicator(bar, "sma", 5))
+        self.bg.update_bar(bar)
+
+    def on_15min_bar(self, bar: BarData) -> None:
+        """"""
+        self.window_values.append(self.get_indicator(bar, "sma", 5))
+
+
+def test_get_indicator() -> None:
+    """
+    Indicator value is looked up by bar, None for window bars and bars
+    before indicator inited.
+    """
+    closes: np.ndarray = 3900 + np.sin(np.arange(60))
+
+    engine: BacktestingEngine = create_engine(IndicatorStrategy, {}, closes)
+    engine.run_backtesting()
+
+    strategy: IndicatorStrategy = engine.strategy        # type: ignore
+    np.testing.assert_array_equal(np.array(strategy.values[4:]), talib.SMA(closes, 5)[4:])
+    assert strategy.values[:4] == [None] * 4
+    assert strategy.window_values == [None] * 4
+
+
+class TradeStrategy(CtaTemplate):
+    """
+    Open position every window bars and close it on next bar.
+    """
+
+    window: int = 10
+
+    parameters = ["window"]
+
+    def on_init(self) -> None:
+        """"""
+        self.bar_count: int = 0
+
+    def on_bar(self, bar: BarData) -> None:
+        """"""
+        self.bar_count += 1
+        self.cancel_all()
+
+        if self.pos:
+            self.sell(bar.close_price - 5, 1)
+        elif not self.bar_count % self.window:
+            self.buy(bar.close_price + 5, 1)
+
+
+def test_result_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Result loaded from cache is the same as backtesting again.
+    """
+    monkeypatch.setattr(backtesting, "get_folder_path", lambda folder_name: tmp_path)
+
+    closes: np.ndarray = 3900 + np.arange(300) % 7
+    engine: BacktestingEngine = create_engine(TradeStrategy, {}, closes, use_cache=True)
+    engine.run_backtesting()
+    assert engine.trades
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    cached_engine: BacktestingEngine = create_engine(TradeStrategy, {}, closes, use_cache=True)
+    cached_engine.run_backtesting()
+    assert not cached_engine.strategy.inited
+
+    assert [trade.__dict__ for trade in cached_engine.trades.values()] == [
+        trade.__dict__ for trade in engine.trades.values()
+    ]
+    assert_frame_equal(cached_engine.calculate_result(), engine.calculate_result(), check_exact=True)
+
+    # Result of other parameters is not loaded from cache
+    other_engine: BacktestingEngine = create_engine(TradeStrategy, {"window": 20}, closes, use_cache=True)
+    other_engine.run_backtesting()
+    assert other_engine.strategy.inited
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+
+
+def test_scenario_analysis(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Naive split datetime is accepted for history data with time zone, and
+    forked or copied scenarios give the same results.
+    """
+    closes: np.ndarray = 3900 + np.arange(300) % 7
+    settings: list[dict] = [{"window": 10}, {"window": 5}, {"window": 20}]
+    split_dt: datetime = START + timedelta(minutes=150)
+
+    def run_scenarios() -> list[tuple[dict, dict]]:
+        engine: BacktestingEngine = create_engine(TradeStrategy, {}, closes)
+        for bar in engine.history_data:
+            bar.datetime = bar.datetime.replace(tzinfo=TZ)
+        return engine.run_scenario_analysis(split_dt, settings, max_workers=2)
+
+    forked_results: list[tuple[dict, dict]] = run_scenarios()
+
+    monkeypatch.setattr(backtesting.multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    copied_results: list[tuple[dict, dict]] = run_scenarios()
+
+    assert [result[0] for result in forked_results] == settings
+    assert forked_results == copied_results
+
+    # Scenario with unchanged setting is the same as full backtesting
+    engine: BacktestingEngine = create_engine(TradeStrategy, {}, closes)
+    engine.run_backtesting()
+    engine.calculate_result()
+    assert copied_results[0][1] == engine.calculate_statistics(output=False)
+    assert copied_results[1][1] != copied_results[0][1]
@@ -0,0 +1,476 @@
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, cast
+import math
+
+import numpy as np
+import pytest
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TradeData
+from vnpy.trader.optimize import OptimizationSetting
+
+from vnpy_ctastrategy import CtaTemplate, backtesting, optimize
+from vnpy_ctastrategy.backtesting import BacktestingEngine, evaluate_stage, wrap_evaluate
+from vnpy_ctastrategy.optimize import (
+    MAX_CANDIDATE_COUNT,
+    GaussianProcess,
+    OptimizationTable,
+    check_optimization_setting,
+    generate_settings,
+    get_setting_count,
+    map_settings,
+    propose_settings,
+    run_bayes_optimization
+)
+from vnpy_ctastrategy.strategies.double_ma_strategy import DoubleMaStrategy
+
+
+START: datetime = datetime(2024, 1, 2, 9)
+
+
+def create_setting(end: int) -> OptimizationSetting:
+    """"""
+    optimization_setting: OptimizationSetting = OptimizationSetting()
+    optimization_setting.set_target("sharpe_ratio")
+    optimization_setting.add_parameter("fast_window", 1, end, 1)
+    optimization_setting.add_parameter("slow_window", 1, end, 1)
+    return optimization_setting
+
+
+def evaluate(setting: dict) -> tuple:
+    """"""
+    return (setting, setting["fast_window"] * 100 + setting["slow_window"], {})
+
+
+def test_generate_settings() -> None:
+    """
+    Settings are generated in same order as OptimizationSetting.
+    """
+    optimization_setting: OptimizationSetting = create_setting(5)
+
+    settings: list[dict] = list(generate_settings(optimization_setting))
+
+    assert settings == optimization_setting.generate_settings()
+    assert get_setting_count(optimization_setting) == 25
+
+
+def test_constraint_pruning() -> None:
+    """
+    Settings failing strategy or caller constraints are skipped.
+    """
+    optimization_setting: OptimizationSetting = create_setting(5)
+
+    settings: list[dict] = list(generate_settings(
+        optimization_setting,
+        [DoubleMaStrategy.check_setting, lambda setting: setting["slow_window"] != 4]
+    ))
+
+    assert settings == [
+        setting for setting in optimization_setting.generate_settings()
+        if setting["fast_window"] < setting["slow_window"] != 4
+    ]
+
+
+def test_lazy_generation() -> None:
+    """
+    Huge grid is not built before first settings taken.
+    """
+    optimization_setting: OptimizationSetting = create_setting(100_000)
+
+    settings: list[dict] = list(islice(generate_settings(optimization_setting), 3))
+
+    assert [setting["slow_window"] for setting in settings] == [1, 2, 3]
+
+
+def test_map_settings() -> None:
+    """
+    Results of all windows are yielded in order of settings.
+    """
+    optimization_setting: OptimizationSetting = create_setting(10)
+
+    with ThreadPoolExecutor(3) as executor:
+        results: list[tuple] = list(map_settings(
+            executor,
+            evaluate,
+            generate_settings(optimization_setting),
+            chunk_size=7,
+            window_size=2
+        ))
+
+    assert results == [evaluate(setting) for setting in optimization_setting.generate_settings()]
+
+
+def test_bayes_without_settings() -> None:
+    """
+    Bayesian optimization returns empty result if all settings pruned.
+    """
+    results: list[tuple] = run_bayes_optimization(
+        evaluate,
+        create_setting(5),
+        lambda result: result[1],
+        output=lambda msg: None,
+        constraints=[lambda setting: False]
+    )
+
+    assert results == []
+
+
+def test_bayes_with_few_settings() -> None:
+    """
+    Initial sample is capped by number of settings left after pruning.
+    """
+    results: list[tuple] = run_bayes_optimization(
+        evaluate,
+        create_setting(5),
+        lambda result: result[1],
+        max_workers=1,
+        output=lambda msg: None,
+        init_count=10,
+        constraints=[lambda setting: setting["fast_window"] == 1 and setting["slow_window"] < 3]
+    )
+
+    assert [result[1] for result in results] == [102, 101]
+
+
+def test_check_optimization_setting() -> None:
+    """
+    Huge grid is checked without generating settings.
+    """
+    assert check_optimization_setting(create_setting(100_000), output=lambda msg: None)
+
+    optimization_setting: OptimizationSetting = OptimizationSetting()
+    optimization_setting.add_parameter("fast_window", 1, 5, 1)
+    assert not check_optimization_setting(optimization_setting, output=lambda msg: None)
+
+
+class WindowStrategy(CtaTemplate):
+    """
+    Open position every window bars and close it after hold bars.
+    """
+
+    window: int = 10
+    hold: int = 1
+
+    parameters = ["window", "hold"]
+
+    def on_init(self) -> None:
+        """"""
+        self.bar_count: int = 0
+        self.hold_count: int = 0
+
+    def on_bar(self, bar: BarData) -> None:
+        """"""
+        self.bar_count += 1
+        self.cancel_all()
+
+        if self.pos:
+            self.hold_count += 1
+            if self.hold_count >= self.hold:
+                self.sell(bar.close_price - 5, 1)
+        elif not self.bar_count % self.window:
+            self.hold_count = 0
+            self.buy(bar.close_price + 5, 1)
+
+
+def generate_bars() -> list[BarData]:
+    """
+    Generate 1 minute bars of day sessions in 5 days.
+    """
+    bars: list[BarData] = []
+
+    for day in range(5):
+        dt: datetime = START + timedelta(days=day)
+
+        for i in range(360):
+            price: float = 3900 + 20 * math.sin(len(bars) / 50) + i % 7
+            bars.append(BarData(
+                symbol="rb2405",
+                exchange=Exchange.SHFE,
+                datetime=dt + timedelta(minutes=i),
+                interval=Interval.MINUTE,
+                open_price=price,
+                high_price=price + 1,
+                low_price=price - 1,
+                close_price=price,
+                volume=1,
+                gateway_name="DB"
+            ))
+
+    return bars
+
+
+@pytest.fixture
+def engine(monkeypatch: pytest.MonkeyPatch) -> Iterator[BacktestingEngine]:
+    """
+    Create engine with database loading replaced by generated bars.
+    """
+    bars: list[BarData] = generate_bars()
+
+    def load_bar_data(
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> list[BarData]:
+        if interval != Interval.MINUTE:
+            return []
+        return [bar for bar in bars if start <= bar.datetime <= end]
+
+    monkeypatch.setattr(backtesting, "load_bar_data", load_bar_data)
+    backtesting.worker_engines.clear()
+
+    backtesting_engine: BacktestingEngine = BacktestingEngine()
+    backtesting_engine.output = lambda msg: None            # type: ignore
+    backtesting_engine.set_parameters(
+        vt_symbol="rb2405.SHFE",
+        interval=Interval.MINUTE,
+        start=START,
+        end=START + timedelta(days=5),
+        rate=0,
+        slippage=0,
+        size=10,
+        pricetick=1,
+        capital=1_000_000
+    )
+    backtesting_engine.add_strategy(WindowStrategy, {})
+
+    yield backtesting_engine
+
+    backtesting.worker_engines.clear()
+
+
+def create_window_setting() -> OptimizationSetting:
+    """"""
+    optimization_setting: OptimizationSetting = OptimizationSetting()
+    optimization_setting.set_target("total_net_pnl")
+    optimization_setting.add_parameter("window", 5, 20, 5)
+    optimization_setting.add_parameter("hold", 1, 3, 1)
+    return optimization_setting
+
+
+def forbid_generate_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Make OptimizationSetting fail if full list of settings is generated.
+    """
+    def generate_settings(self: OptimizationSetting) -> list[dict]:
+        raise AssertionError("full list of settings generated")
+
+    monkeypatch.setattr(OptimizationSetting, "generate_settings", generate_settings)
+
+
+def run_setting(engine: BacktestingEngine, setting: dict) -> dict:
+    """
+    Return statistics of backtesting with setting.
+    """
+    engine.clear_data()
+    engine.add_strategy(WindowStrategy, setting)
+    engine.run_backtesting()
+    return engine.calculate_fast_statistics()
+
+
+def test_bf_optimization_lazy(engine: BacktestingEngine, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Engine runs brute force optimization without full list of settings.
+    """
+    forbid_generate_settings(monkeypatch)
+
+    results: list[tuple] = engine.run_bf_optimization(
+        create_window_setting(),
+        output=False,
+        max_workers=1,
+        executor=ThreadPoolExecutor(1)
+    )
+
+    assert len(results) == 12
+
+    engine.load_data()
+    setting, target, _ = results[0]
+    assert run_setting(engine, setting)["total_net_pnl"] == target
+
+
+def test_table_optimization_lazy(engine: BacktestingEngine, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Engine adds results into table without full list of settings.
+    """
+    forbid_generate_settings(monkeypatch)
+
+    table: OptimizationTable | None = engine.run_table_optimization(
+        create_window_setting(),
+        output=False,
+        max_workers=1,
+        top_count=3,
+        executor=ThreadPoolExecutor(1)
+    )
+
+    assert table is not None
+    assert len(table) == 12
+
+    targets: list[float] = sorted(table.data["target"], reverse=True)
+    assert [result[1] for result in table.top_results] == targets[:3]
+
+
+class RecordExecutor(ThreadPoolExecutor):
+    """
+    Thread pool recording settings or chunks of settings sent by map.
+    """
+
+    def __init__(self) -> None:
+        """"""
+        super().__init__(1)
+        self.settings: list[dict] = []
+
+    def map(self, fn: Callable, *iterables: Iterable, **kwargs: Any) -> Iterator:   # type: ignore
+        """"""
+        settings: list[dict] = list(iterables[0])
+        self.settings.extend(settings)
+        return super().map(fn, settings, **kwargs)
+
+
+def test_ga_optimization_executor(engine: BacktestingEngine, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Genetic algorithm runs settings with given executor, and each setting
+    is sent only once.
+    """
+    forbid_generate_settings(monkeypatch)
+
+    executor: RecordExecutor = RecordExecutor()
+    results: list[tuple] = engine.run_ga_optimization(
+        create_window_setting(),
+        output=False,
+        pop_size=8,
+        ngen=3,
+        executor=executor
+    )
+
+    keys: list[tuple] = [tuple(setting.items()) for setting in executor.settings]
+    assert len(set(keys)) == len(keys)
+    assert sorted(keys) == sorted(tuple(result[0].items()) for result in results)
+
+    engine.load_data()
+    setting, target, _ = results[0]
+    assert run_setting(engine, setting)["total_net_pnl"] == target
+    assert target == max(result[1] for result in results)
+
+
+def test_bf_optimization_resume(
+    engine: BacktestingEngine,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path
+) -> None:
+    """
+    Optimization resumed later in the day with default end does not run
+    saved settings again.
+    """
+    monkeypatch.setattr(optimize, "get_folder_path", lambda folder_name: tmp_path)
+
+    def run_resume(executor: RecordExecutor) -> list[tuple]:
+        resume_engine: BacktestingEngine = BacktestingEngine()
+        resume_engine.output = lambda msg: None            # type: ignore
+        resume_engine.set_parameters(
+            vt_symbol=engine.vt_symbol,
+            interval=engine.interval,
+            start=engine.start,
+            rate=engine.rate,
+            slippage=engine.slippage,
+            size=engine.size,
+            pricetick=engine.pricetick,
+            capital=engine.capital
+        )
+        resume_engine.add_strategy(WindowStrategy, {})
+
+        return resume_engine.run_bf_optimization(
+            create_window_setting(),
+            output=False,
+            max_workers=1,
+            resume=True,
+            executor=executor
+        )
+
+    executor: RecordExecutor = RecordExecutor()
+    results: list[tuple] = run_resume(executor)
+    assert executor.settings and len(results) == 12
+
+    resumed_executor: RecordExecutor = RecordExecutor()
+    resumed_results: list[tuple] = run_resume(resumed_executor)
+    assert not resumed_executor.settings
+
+    assert [result[:2] for result in resumed_results] == [result[:2] for result in results]
+    assert [result[2] for result in resumed_results] == [result[2] for result in results]
+
+
+def test_propose_settings_sample(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Only a sample of unevaluated points is scored on huge grid.
+    """
+    sizes: list[int] = []
+    predict: Callable = GaussianProcess.predict
+
+    def record_predict(self: GaussianProcess, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        sizes.append(len(x))
+        return predict(self, x)
+
+    monkeypatch.setattr(GaussianProcess, "predict", record_predict)
+
+    rng: np.random.Generator = np.random.default_rng(0)
+    points: np.ndarray = rng.random((MAX_CANDIDATE_COUNT * 3, 2))
+    observed: list[int] = list(range(10))
+    values: list[float] = [float(points[ix].sum()) for ix in observed]
+
+    proposed: list[int] = propose_settings(GaussianProcess(), points, observed, values, 3, rng)
+
+    assert len(set(proposed)) == 3
+    assert not set(proposed) & set(observed)
+    assert max(sizes) <= MAX_CANDIDATE_COUNT
+
+
+@pytest.mark.parametrize("checkpoint", [True, False])
+def test_evaluate_stage(
+    engine: BacktestingEngine,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    checkpoint: bool
+) -> None:
+    """
+    Backtesting run in stages from checkpoints, or restarted from beginning
+    if checkpoint not saved, is the same as one full run.
+    """
+    if not checkpoint:
+        monkeypatch.setattr(BacktestingEngine, "save_checkpoint", lambda self, path: False)
+
+    # Record trades of engine when statistics calculated
+    stage_trades: list[list[TradeData]] = []
+    calculate_fast_statistics: Callable = BacktestingEngine.calculate_fast_statistics
+
+    def record_trades(self: BacktestingEngine) -> dict:
+        stage_trades.append(list(self.trades.values()))
+        return cast(dict, calculate_fast_statistics(self))
+
+    monkeypatch.setattr(BacktestingEngine, "calculate_fast_statistics", record_trades)
+
+    setting: dict = {"window": 10, "hold": 2}
+    evaluate_func: Callable = wrap_evaluate(engine, "total_net_pnl", evaluate_stage)
+
+    path: str = ""
+    fractions: list[float] = [0, 0.2, 0.5, 1]
+
+    for start_fraction, end_fraction in zip(fractions[:-1], fractions[1:], strict=True):
+        _, _, statistics, next_path = evaluate_func((setting, start_fraction, end_fraction, path, str(tmp_path)))
+
+        # Checkpoint file is removed after loaded
+        assert not path or not Path(path).exists()
+        assert bool(next_path) == (checkpoint and end_fraction < 1)
+        path = next_path
+
+    assert not list(tmp_path.iterdir())
+    trades: list[TradeData] = stage_trades[-1]
+
+    engine.load_data()
+    assert run_setting(engine, setting) == statistics
+    assert trades and [trade.__dict__ for trade in trades] == [
+        trade.__dict__ for trade in engine.trades.values()
+    ]
@@ -0,0 +1,107 @@
+from collections.abc import Iterator
+from multiprocessing import get_context
+from multiprocessing.context import SpawnProcess
+from pathlib import Path
+import os
+
+import pytest
+
+from vnpy_ctastrategy.optimize import QueueExecutor, run_queue_workers
+
+
+def start_workers(queue_executor: QueueExecutor, count: int) -> SpawnProcess:
+    """
+    Start worker processes connected to queue server.
+    """
+    process: SpawnProcess = get_context("spawn").Process(
+        target=run_queue_workers,
+        args=(queue_executor.address, queue_executor.authkey, count, 10)
+    )
+    process.start()
+    return process
+
+
+@pytest.fixture(scope="module")
+def executor() -> Iterator[QueueExecutor]:
+    """
+    Start queue server on random port, with worker processes connected.
+    """
+    queue_executor: QueueExecutor = QueueExecutor(("127.0.0.1", 0), batch_size=2)
+    process: SpawnProcess = start_workers(queue_executor, 2)
+
+    yield queue_executor
+
+    queue_executor.shutdown()
+    process.join(10)
+    assert process.exitcode == 0
+
+
+def test_default_server() -> None:
+    """
+    Server listens on localhost with random authkey by default.
+    """
+    queue_executor: QueueExecutor = QueueExecutor(("127.0.0.1", 0))
+    queue_executor.shutdown()
+
+    assert queue_executor.address[0] == "127.0.0.1"
+    assert len(queue_executor.authkey) == 32
+
+
+def test_map(executor: QueueExecutor) -> None:
+    """
+    Results are yielded in order of tasks.
+    """
+    results: list = list(executor.map(pow, range(20), [2] * 20, timeout=30))
+    assert results == [i ** 2 for i in range(20)]
+
+
+def test_overlapping_map(executor: QueueExecutor) -> None:
+    """
+    Results of map calls sent before being read are kept apart.
+    """
+    first: Iterator = executor.map(abs, range(-10, 0))
+    second: Iterator = executor.map(abs, range(10))
+
+    assert list(second) == list(range(10))
+    assert list(first) == list(range(10, 0, -1))
+
+
+def test_submit(executor: QueueExecutor) -> None:
+    """
+    Future of single task receives its result or exception.
+    """
+    assert executor.submit(divmod, 7, 2).result(30) == (3, 1)
+    assert executor.submit(int, "10", base=2).result(30) == 2
+
+    with pytest.raises(RuntimeError, match="ValueError"):
+        executor.submit(int, "x").result(30)
+
+
+def exit_once(path: Path, value: int) -> int:
+    """
+    Kill worker process on first run, and return value on next run.
+    """
+    if not path.exists():
+        path.touch()
+        os._exit(1)
+    return value
+
+
+def test_worker_lost(tmp_path: Path) -> None:
+    """
+    Batch lost with its worker is sent again, and fails after timeout if
+    no retry left.
+    """
+    queue_executor: QueueExecutor = QueueExecutor(("127.0.0.1", 0), timeout=1)
+    process: SpawnProcess = start_workers(queue_executor, 2)
+
+    path: Path = tmp_path.joinpath("exited")
+    assert queue_executor.submit(exit_once, path, 10).result(30) == 10
+
+    queue_executor.retry_count = 0
+    with pytest.raises(TimeoutError):
+        queue_executor.submit(os._exit, 1).result(30)
+
+    queue_executor.shutdown()
+    process.join(10)
+    assert process.exitcode == 0
@@ -0,0 +1,209 @@
+from collections.abc import Iterator
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import BarGenerator
+
+from vnpy_ctastrategy import backtesting
+from vnpy_ctastrategy.backtesting import BacktestingEngine, resample_bar_data
+
+
+DAILY_END: time = time(14, 59)
+
+
+def generate_bars(start: datetime, end: datetime) -> list[BarData]:
+    """
+    Generate 1 minute bars in [start, end) with increasing prices.
+    """
+    bars: list[BarData] = []
+
+    dt: datetime = start
+    while dt < end:
+        price: float = 100 + len(bars)
+        bars.append(BarData(
+            symbol="rb2405",
+            exchange=Exchange.SHFE,
+            datetime=dt,
+            interval=Interval.MINUTE,
+            open_price=price,
+            high_price=price + 1,
+            low_price=price - 1,
+            close_price=price + 0.5,
+            volume=1,
+            turnover=price,
+            open_interest=len(bars),
+            gateway_name="DB"
+        ))
+        dt += timedelta(minutes=1)
+
+    return bars
+
+
+def generate_trading_bars() -> list[BarData]:
+    """
+    Generate bars of Friday day session, Friday night session ending on
+    Saturday morning, and Monday day session.
+    """
+    return (
+        generate_bars(datetime(2024, 1, 5, 9), datetime(2024, 1, 5, 15))
+        + generate_bars(datetime(2024, 1, 5, 21), datetime(2024, 1, 6, 2, 30))
+        + generate_bars(datetime(2024, 1, 8, 9), datetime(2024, 1, 8, 15))
+    )
+
+
+def generate_daily_bars(bars: list[BarData]) -> list[BarData]:
+    """
+    Generate daily bars with BarGenerator.
+    """
+    daily_bars: list[BarData] = []
+
+    generator: BarGenerator = BarGenerator(
+        lambda bar: None,
+        window=1,
+        on_window_bar=daily_bars.append,
+        interval=Interval.DAILY,
+        daily_end=DAILY_END
+    )
+
+    for bar in bars:
+        generator.update_bar(bar)
+
+    return daily_bars
+
+
+def test_weekend_night_session() -> None:
+    """
+    Friday night session is merged into Monday daily bar.
+    """
+    bars: list[BarData] = generate_trading_bars()
+
+    results: list[BarData] = resample_bar_data(bars, Interval.DAILY, DAILY_END)
+    expected: list[BarData] = generate_daily_bars(bars)
+
+    assert [bar.datetime.date() for bar in results] == [
+        datetime(2024, 1, 5).date(),
+        datetime(2024, 1, 8).date()
+    ]
+
+    for result, bar in zip(results, expected, strict=True):
+        assert result.datetime == bar.datetime
+        assert result.open_price == bar.open_price
+        assert result.high_price == bar.high_price
+        assert result.low_price == bar.low_price
+        assert result.close_price == bar.close_price
+        assert result.volume == bar.volume
+        assert result.turnover == bar.turnover
+        assert result.open_interest == bar.open_interest
+
+
+def test_partial_daily_bar() -> None:
+    """
+    Bars after the last daily end are kept as partial daily bar.
+    """
+    bars: list[BarData] = generate_bars(datetime(2024, 1, 5, 9), datetime(2024, 1, 5, 10))
+
+    results: list[BarData] = resample_bar_data(bars, Interval.DAILY, DAILY_END)
+
+    assert len(results) == 1
+    assert results[0].volume == len(bars)
+
+
+class MinuteDatabase:
+    """
+    Database with 1 minute bars only.
+    """
+
+    def __init__(self) -> None:
+        """"""
+        self.bars: list[BarData] = generate_trading_bars()
+        self.intervals: list[Interval] = []
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> list[BarData]:
+        """"""
+        self.intervals.append(interval)
+
+        if interval != Interval.MINUTE:
+            return []
+        return [bar for bar in self.bars if start <= bar.datetime <= end]
+
+    def load_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> list:
+        """"""
+        return []
+
+
+@pytest.fixture
+def minute_database(monkeypatch: pytest.MonkeyPatch) -> Iterator[MinuteDatabase]:
+    """
+    Replace database with 1 minute bars only.
+    """
+    database: MinuteDatabase = MinuteDatabase()
+
+    monkeypatch.setattr(backtesting, "get_database", lambda: database)
+    backtesting.load_bar_data.cache_clear()
+    backtesting.load_resampled_bar_data.cache_clear()
+
+    yield database
+
+    backtesting.load_bar_data.cache_clear()
+    backtesting.load_resampled_bar_data.cache_clear()
+
+
+def create_engine() -> BacktestingEngine:
+    """"""
+    engine: BacktestingEngine = BacktestingEngine()
+    engine.output = lambda msg: None            # type: ignore
+
+    engine.set_parameters(
+        vt_symbol="rb2405.SHFE",
+        interval=Interval.HOUR,
+        start=datetime(2024, 1, 5),
+        end=datetime(2024, 1, 9),
+        rate=0,
+        slippage=0,
+        size=10,
+        pricetick=1
+    )
+    return engine
+
+
+@pytest.mark.usefixtures("minute_database")
+def test_reload_resampled_data() -> None:
+    """
+    Reloading resampled data does not clear data cached for other engines.
+    """
+    engine: BacktestingEngine = create_engine()
+    engine.load_data()
+    count: int = len(engine.history_data)
+    assert count
+
+    engine.load_data()
+    assert len(engine.history_data) == count
+
+    other: BacktestingEngine = create_engine()
+    other.load_data()
+    assert len(other.history_data) == count
+
+
+def test_finer_data_not_cached(minute_database: MinuteDatabase) -> None:
+    """
+    Only resampled bars are cached, without minute bars loaded for them.
+    """
+    engine: BacktestingEngine = create_engine()
+    engine.load_data()
+    assert engine.history_data
+    assert Interval.MINUTE in minute_database.intervals
+
+    # Only empty results of hour bars loaded first are cached
+    hour_count: int = minute_database.intervals.count(Interval.HOUR)
+    assert backtesting.load_bar_data.cache_info().currsize == hour_count
+    assert backtesting.load_resampled_bar_data.cache_info().currsize == 1
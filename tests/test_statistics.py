@@ -0,0 +1,74 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from vnpy_ctastrategy.statistics import calculate_range_extremum, match_round_trips
+
+
+def match_round_trips_fifo(volume: np.ndarray) -> list[tuple[int, int, float]]:
+    """
+    Match trades into round trips with FIFO queue of open positions.
+    """
+    queue: deque[list] = deque()
+    results: list[tuple[int, int, float]] = []
+
+    for ix, v in enumerate(volume):
+        remaining: float = abs(v)
+
+        # Close opposite positions first, in opening order
+        while queue and remaining and np.sign(queue[0][1]) != np.sign(v):
+            open_ix, open_volume = queue[0]
+            match_volume: float = min(remaining, abs(open_volume))
+            results.append((open_ix, ix, match_volume))
+
+            remaining -= match_volume
+            queue[0][1] = np.sign(open_volume) * (abs(open_volume) - match_volume)
+            if not queue[0][1]:
+                queue.popleft()
+
+        if remaining:
+            queue.append([ix, np.sign(v) * remaining])
+
+    return results
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_match_round_trips(seed: int) -> None:
+    """
+    Vectorized matching is the same as FIFO queue, with reversing trades.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    volume: np.ndarray = rng.integers(1, 5, 200) * rng.choice([-1, 1], 200)
+
+    open_ix, close_ix, match_volume = match_round_trips(volume.astype(float))
+
+    assert list(zip(open_ix.tolist(), close_ix.tolist(), match_volume.tolist(), strict=True)) == (
+        match_round_trips_fifo(volume)
+    )
+
+
+def test_match_round_trips_without_close() -> None:
+    """"""
+    open_ix, close_ix, match_volume = match_round_trips(np.array([1.0, 2.0]))
+
+    assert not len(open_ix) and not len(close_ix) and not len(match_volume)
+
+
+@pytest.mark.parametrize("count", [1, 2, 100])
+def test_range_extremum(count: int) -> None:
+    """
+    Extremum of every range is the same as reducing its slice.
+    """
+    rng: np.random.Generator = np.random.default_rng(count)
+    values: np.ndarray = rng.random(count)
+
+    starts: np.ndarray = rng.integers(0, count, 300)
+    ends: np.ndarray = np.array([rng.integers(start, count) for start in starts])
+
+    highs: np.ndarray = calculate_range_extremum(values, starts, ends, np.maximum)
+    lows: np.ndarray = calculate_range_extremum(values, starts, ends, np.minimum)
+
+    slices: list[np.ndarray] = [values[start:end + 1] for start, end in zip(starts, ends, strict=True)]
+    assert highs.tolist() == [s.max() for s in slices]
+    assert lows.tolist() == [s.min() for s in slices]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import talib
+
+from vnpy_ctastrategy.utility import (
+    AtrIndicator,
+    DonchianIndicator,
+    RsiIndicator,
+    SmaIndicator
+)
+
+
+N: int = 14
+
+
+@pytest.fixture
+def prices() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generate random walk of (high, low, close) prices.
+    """
+    rng: np.random.Generator = np.random.default_rng(0)
+
+    close: np.ndarray = 4000 + np.cumsum(rng.normal(0, 2, 5000))
+    high: np.ndarray = close + rng.uniform(0, 3, 5000)
+    low: np.ndarray = close - rng.uniform(0, 3, 5000)
+    return high, low, close
+
+
+def test_sma(prices: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    """"""
+    _, _, close = prices
+
+    sma: SmaIndicator = SmaIndicator(N)
+    values: list[float] = [sma.update(price) for price in close]
+
+    np.testing.assert_allclose(values[N - 1:], talib.SMA(close, N)[N - 1:], rtol=1e-12)
+
+
+def test_rsi(prices: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    """"""
+    _, _, close = prices
+
+    rsi: RsiIndicator = RsiIndicator(N)
+    values: list[float] = [rsi.update(price) for price in close]
+
+    np.testing.assert_allclose(values[N:], talib.RSI(close, N)[N:], rtol=1e-12)
+
+
+def test_atr(prices: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    """"""
+    high, low, close = prices
+
+    atr: AtrIndicator = AtrIndicator(N)
+    values: list[float] = [atr.update(*bar) for bar in zip(high, low, close, strict=True)]
+
+    np.testing.assert_allclose(values[N:], talib.ATR(high, low, close, N)[N:], rtol=1e-12)
+
+
+def test_donchian(prices: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    """"""
+    high, low, _ = prices
+
+    donchian: DonchianIndicator = DonchianIndicator(N)
+    values: list[tuple[float, float]] = [donchian.update(*bar) for bar in zip(high, low, strict=True)]
+
+    up, down = zip(*values[N - 1:], strict=True)
+    assert list(up) == list(talib.MAX(high, N)[N - 1:])
+    assert list(down) == list(talib.MIN(low, N)[N - 1:])
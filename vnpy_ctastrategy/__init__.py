@@ -31,6 +31,16 @@ from vnpy.trader.utility import BarGenerator, ArrayManager
 from .base import APP_NAME, StopOrder
 from .engine import CtaEngine
 from .template import CtaTemplate, CtaSignal, TargetPosTemplate
+from .utility import (
+    RingArrayManager,
+    SmaIndicator,
+    BollIndicator,
+    RsiIndicator,
+    AtrIndicator,
+    CciIndicator,
+    KeltnerIndicator,
+    DonchianIndicator
+)
 
 
 __all__ = [
@@ -47,6 +57,14 @@ __all__ = [
     "OrderData",
     "BarGenerator",
     "ArrayManager",
+    "RingArrayManager",
+    "SmaIndicator",
+    "BollIndicator",
+    "RsiIndicator",
+    "AtrIndicator",
+    "CciIndicator",
+    "KeltnerIndicator",
+    "DonchianIndicator",
     "CtaStrategyApp",
 ]
 
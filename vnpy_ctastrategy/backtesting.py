@@ -1,16 +1,31 @@
-from collections import defaultdict
+from bisect import bisect_left
+from collections import deque
+from copy import deepcopy
 from datetime import (
     date as Date,
     datetime,
-    timedelta
+    time,
+    timedelta,
+    tzinfo
 )
 from typing import cast, Any
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
 from functools import lru_cache, partial
+from itertools import product
+import hashlib
+import inspect
+from logging import INFO
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+import os
+from pathlib import Path
+import pickle
 import traceback
+from uuid import uuid4
 
 import numpy as np
-from pandas import DataFrame, Series
+from pandas import DataFrame, DatetimeIndex, Series, concat, to_datetime
 from pandas.core.window import ExponentialMovingWindow
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -24,13 +39,8 @@ from vnpy.trader.constant import (
 )
 from vnpy.trader.database import get_database, BaseDatabase
 from vnpy.trader.object import OrderData, TradeData, BarData, TickData
-from vnpy.trader.utility import round_to, extract_vt_symbol
-from vnpy.trader.optimize import (
-    OptimizationSetting,
-    check_optimization_setting,
-    run_bf_optimization,
-    run_ga_optimization
-)
+from vnpy.trader.utility import round_to, extract_vt_symbol, get_folder_path, ArrayManager
+from vnpy.trader.optimize import OptimizationSetting
 
 from .base import (
     BacktestingMode,
@@ -41,9 +51,43 @@ from .base import (
     INTERVAL_DELTA_MAP
 )
 from .template import CtaTemplate
+from .optimize import (
+    OptimizationStore,
+    OptimizationStream,
+    OptimizationTable,
+    check_optimization_setting,
+    run_bayes_optimization,
+    run_bf_optimization,
+    run_ga_optimization,
+    run_halving_optimization,
+    run_wf_optimization
+)
+from .statistics import (
+    calculate_statistics,
+    calculate_batch_statistics,
+    calculate_bootstrap_statistics,
+    calculate_drawdown,
+    calculate_range_extremum,
+    match_round_trips
+)
 from .locale import _
 
 
+# Number of daily values resampled in one bootstrap chunk
+BOOTSTRAP_CHUNK_ELEMENTS: int = 2_500_000
+
+# Folder for saving backtesting result cache files
+RESULT_CACHE_FOLDER: str = "cta_backtesting_cache"
+
+# Engines with history data loaded in optimization worker process
+worker_engines: dict[tuple, "BacktestingEngine"] = {}
+window_engines: dict[tuple, "BacktestingEngine"] = {}
+
+# Indicator arrays shared by all backtesting runs in the same process
+INDICATOR_CACHE_SIZE: int = 128
+indicator_cache: dict[tuple, Any] = {}
+
+
 class BacktestingEngine:
     """"""
 
@@ -66,6 +110,8 @@ class BacktestingEngine:
         self.annual_days: int = 240
         self.half_life: int = 120
         self.mode: BacktestingMode = BacktestingMode.BAR
+        self.daily_end: time | None = None
+        self.use_cache: bool = False
 
         self.strategy_class: type[CtaTemplate]
         self.strategy: CtaTemplate
@@ -77,6 +123,8 @@ class BacktestingEngine:
         self.days: int = 0
         self.callback: Callable
         self.history_data: list = []
+        self.history_arrays: dict[str, np.ndarray] = {}
+        self.data_fingerprint: str = ""
 
         self.stop_order_count: int = 0
         self.stop_orders: dict[str, StopOrder] = {}
@@ -89,7 +137,11 @@ class BacktestingEngine:
         self.trade_count: int = 0
         self.trades: dict[str, TradeData] = {}
 
-        self.logs: list = []
+        self.logs: LogBuffer = LogBuffer()
+
+        self.record_equity: bool = False
+        self.constraints: list[Callable[[dict], bool]] = []
+        self.equity_recorder: EquityRecorder | None = None
 
         self.daily_results: dict[Date, DailyResult] = {}
         self.daily_df: DataFrame = DataFrame()
@@ -109,8 +161,11 @@ class BacktestingEngine:
         self.trade_count = 0
         self.trades.clear()
 
+        self.equity_recorder = None
+
         self.logs.clear()
         self.daily_results.clear()
+        self.daily_df = DataFrame()
 
     def set_parameters(
         self,
@@ -126,7 +181,9 @@ class BacktestingEngine:
         mode: BacktestingMode = BacktestingMode.BAR,
         risk_free: float = 0,
         annual_days: int = 240,
-        half_life: int = 120
+        half_life: int = 120,
+        daily_end: time | None = None,
+        use_cache: bool = False
     ) -> None:
         """"""
         self.mode = mode
@@ -151,6 +208,38 @@ class BacktestingEngine:
         self.risk_free = risk_free
         self.annual_days = annual_days
         self.half_life = half_life
+        self.daily_end = daily_end
+        self.use_cache = use_cache
+
+    def set_log_buffer(
+        self,
+        size: int | None = None,
+        ring: bool = False,
+        enabled: bool = True
+    ) -> None:
+        """
+        Set log storage of strategy, logs already written are discarded.
+        """
+        self.logs = LogBuffer(size, ring, enabled)
+
+    def set_equity_recording(self, enabled: bool = True) -> None:
+        """
+        Set whether to record equity at every bar/tick in backtesting.
+        """
+        self.record_equity = enabled
+
+    def set_constraints(self, constraints: list[Callable[[dict], bool]]) -> None:
+        """
+        Set functions checking settings in optimization, with settings
+        returning False skipped before run.
+        """
+        self.constraints = constraints
+
+    def get_constraints(self) -> list[Callable[[dict], bool]]:
+        """
+        Return setting check of strategy class and constraints set.
+        """
+        return [self.strategy_class.check_setting, *self.constraints]
 
     def add_strategy(self, strategy_class: type[CtaTemplate], setting: dict) -> None:
         """"""
@@ -171,6 +260,8 @@ class BacktestingEngine:
             return
 
         self.history_data.clear()       # Clear previously loaded history data
+        self.history_arrays.clear()
+        self.data_fingerprint = ""
 
         # Load 30 days of data each time and allow for progress update
         total_days: int = (self.end - self.start).days
@@ -212,14 +303,53 @@ class BacktestingEngine:
             start = end + interval_delta
             end += progress_delta
 
+        # Resample from finer data if no data stored with backtesting interval
+        if self.mode == BacktestingMode.BAR and not self.history_data:
+            self.output(_("未找到{}周期数据，使用更小周期数据合成").format(self.interval.value))
+
+            # Copy cached list, which is cleared when data reloaded
+            self.history_data = list(load_resampled_bar_data(
+                self.symbol,
+                self.exchange,
+                self.interval,
+                self.start,
+                self.end,
+                self.daily_end
+            ))
+
         self.output(_("历史数据加载完成，数据量：{}").format(len(self.history_data)))
 
     def run_backtesting(self) -> None:
         """"""
-        if self.mode == BacktestingMode.BAR:
-            func: Callable[[Any], None] = self.new_bar
-        else:
-            func = self.new_tick
+        # Result cache is not used when equity of every bar is required
+        cache_key: str = ""
+        if self.use_cache and not self.record_equity:
+            cache_key = self.get_cache_key()
+
+        if cache_key and self.load_cached_result(cache_key):
+            self.output(_("读取回测结果缓存：{}").format(cache_key))
+            return
+
+        self.start_backtesting()
+
+        if self.replay_data(self.history_data):
+            self.stop_backtesting()
+
+            if cache_key:
+                self.save_cached_result(cache_key)
+
+    def start_backtesting(self) -> None:
+        """
+        Init and start strategy before replaying history data.
+        """
+        if self.record_equity:
+            self.equity_recorder = EquityRecorder(
+                len(self.history_data),
+                self.capital,
+                self.size,
+                self.rate,
+                self.slippage
+            )
 
         self.strategy.on_init()
         self.strategy.inited = True
@@ -229,23 +359,39 @@ class BacktestingEngine:
         self.strategy.trading = True
         self.output(_("开始回放历史数据"))
 
-        total_size: int = len(self.history_data)
+    def replay_data(self, history_data: list, progress: bool = True) -> bool:
+        """
+        Replay history data into strategy, return False if exception raised.
+        """
+        if self.mode == BacktestingMode.BAR:
+            func: Callable[[Any], None] = self.new_bar
+        else:
+            func = self.new_tick
+
+        total_size: int = len(history_data)
         batch_size: int = max(int(total_size / 10), 1)
 
         for ix, i in enumerate(range(0, total_size, batch_size)):
-            batch_data: list = self.history_data[i: i + batch_size]
+            batch_data: list = history_data[i: i + batch_size]
             for data in batch_data:
                 try:
                     func(data)
                 except Exception:
                     self.output(_("触发异常，回测终止"))
                     self.output(traceback.format_exc())
-                    return
+                    return False
 
-            progress = min(ix / 10, 1)
-            progress_bar: str = "=" * (ix + 1)
-            self.output(_("回放进度：{} [{:.0%}]").format(progress_bar, progress))
+            if progress:
+                progress_value = min(ix / 10, 1)
+                progress_bar: str = "=" * (ix + 1)
+                self.output(_("回放进度：{} [{:.0%}]").format(progress_bar, progress_value))
 
+        return True
+
+    def stop_backtesting(self) -> None:
+        """
+        Stop strategy after replaying history data.
+        """
         self.strategy.on_stop()
         self.output(_("历史数据回放结束"))
 
@@ -256,38 +402,15 @@ class BacktestingEngine:
         if not self.trades:
             self.output(_("回测成交记录为空"))
 
-        # Add trade data into daily reuslt.
-        for trade in self.trades.values():
-            d: Date = trade.datetime.date()
-            daily_result: DailyResult = self.daily_results[d]
-            daily_result.add_trade(trade)
-
-        # Calculate daily result by iteration.
-        pre_close: float = 0
-        start_pos: float = 0
-
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_close,
-                start_pos,
+        if self.daily_results:
+            self.daily_df = calculate_daily_df(
+                list(self.daily_results.values()),
+                list(self.trades.values()),
                 self.size,
                 self.rate,
                 self.slippage
             )
 
-            pre_close = daily_result.close_price
-            start_pos = daily_result.end_pos
-
-        # Generate dataframe
-        results: defaultdict = defaultdict(list)
-
-        for daily_result in self.daily_results.values():
-            for key, value in daily_result.__dict__.items():
-                results[key].append(value)
-
-        if results:
-            self.daily_df = DataFrame.from_dict(results).set_index("date")
-
         self.output(_("逐日盯市盈亏计算完成"))
         return self.daily_df
 
@@ -492,8 +615,325 @@ class BacktestingEngine:
         self.output(_("策略统计指标计算完成"))
         return statistics
 
-    def show_chart(self, df: DataFrame | None = None) -> go.Figure:
-        """"""
+    def calculate_fast_statistics(self) -> dict:
+        """
+        Calculate statistics with NumPy arrays, without generating daily_df.
+        Used for running large number of backtestings in optimization.
+        """
+        if not self.daily_results:
+            return {}
+
+        data: dict = calculate_daily_pnl(
+            list(self.daily_results.values()),
+            list(self.trades.values()),
+            self.size,
+            self.rate,
+            self.slippage
+        )
+
+        return calculate_statistics(
+            data["date"],
+            data["net_pnl"],
+            data["commission"],
+            data["slippage"],
+            data["turnover"],
+            data["trade_count"],
+            self.capital,
+            self.risk_free,
+            self.annual_days,
+            self.half_life
+        )
+
+    def calculate_round_trips(self) -> DataFrame:
+        """
+        Match trades into round trips with FIFO rule, return DataFrame with
+        a row for each pair of opening and closing trade.
+
+        MAE/MFE are the max adverse/favorable excursion of price during
+        holding, in money value of the round trip volume.
+        """
+        trades: list[TradeData] = list(self.trades.values())
+        if not trades:
+            return DataFrame()
+
+        price: np.ndarray = np.array([trade.price for trade in trades], dtype=float)
+        timestamp: np.ndarray = np.array([trade.datetime.timestamp() for trade in trades])      # type: ignore
+        volume: np.ndarray = np.array(
+            [trade.volume if trade.direction == Direction.LONG else -trade.volume for trade in trades],
+            dtype=float
+        )
+
+        open_ix, close_ix, match_volume = match_round_trips(volume)
+        if not len(open_ix):
+            return DataFrame()
+
+        direction: np.ndarray = np.sign(volume[open_ix])
+        open_price: np.ndarray = price[open_ix]
+        close_price: np.ndarray = price[close_ix]
+        volume_size: np.ndarray = match_volume * self.size
+
+        pnl: np.ndarray = direction * (close_price - open_price) * volume_size
+        commission: np.ndarray = (open_price + close_price) * volume_size * self.rate
+        slippage: np.ndarray = volume_size * self.slippage * 2
+
+        # Locate bars/ticks of trades for price range during holding
+        history_arrays: dict[str, np.ndarray] = self.get_history_arrays()
+        if self.mode == BacktestingMode.BAR:
+            high_array: np.ndarray = history_arrays["high_price"]
+            low_array: np.ndarray = history_arrays["low_price"]
+        else:
+            high_array = low_array = history_arrays["last_price"]
+
+        history_ix: np.ndarray = np.searchsorted(history_arrays["datetime"], timestamp)
+        history_ix = np.minimum(history_ix, len(high_array) - 1)
+        open_bar: np.ndarray = history_ix[open_ix]
+        close_bar: np.ndarray = history_ix[close_ix]
+
+        high: np.ndarray = calculate_range_extremum(high_array, open_bar, close_bar, np.maximum)
+        low: np.ndarray = calculate_range_extremum(low_array, open_bar, close_bar, np.minimum)
+
+        mae: np.ndarray = np.where(direction > 0, low - open_price, open_price - high) * volume_size
+        mfe: np.ndarray = np.where(direction > 0, high - open_price, open_price - low) * volume_size
+
+        tz: tzinfo | None = trades[0].datetime.tzinfo                                       # type: ignore
+
+        df: DataFrame = DataFrame({
+            "open_datetime": to_datetime(timestamp[open_ix], unit="s", utc=True).tz_convert(tz),
+            "close_datetime": to_datetime(timestamp[close_ix], unit="s", utc=True).tz_convert(tz),
+            "direction": [Direction.LONG if d > 0 else Direction.SHORT for d in direction],
+            "volume": match_volume,
+            "open_price": open_price,
+            "close_price": close_price,
+            "pnl": pnl,
+            "commission": commission,
+            "slippage": slippage,
+            "net_pnl": pnl - commission - slippage,
+            "holding_bars": close_bar - open_bar,
+            "mae": mae,
+            "mfe": mfe
+        })
+        df["holding_time"] = df["close_datetime"] - df["open_datetime"]
+        return df
+
+    def calculate_round_trip_statistics(
+        self,
+        df: DataFrame | None = None,
+        output: bool = True
+    ) -> dict:
+        """
+        Calculate statistics of round trips.
+        """
+        if df is None:
+            df = self.calculate_round_trips()
+
+        if df.empty:
+            self.output(_("回测成交记录为空"))
+            return {}
+
+        net_pnl: np.ndarray = df["net_pnl"].values
+        win_pnl: np.ndarray = net_pnl[net_pnl > 0]
+        loss_pnl: np.ndarray = net_pnl[net_pnl <= 0]
+
+        round_trip_count: int = len(net_pnl)
+        win_count: int = len(win_pnl)
+        loss_count: int = len(loss_pnl)
+
+        win_rate: float = win_count / round_trip_count * 100
+        average_win: float = win_pnl.mean() if win_count else 0
+        average_loss: float = loss_pnl.mean() if loss_count else 0
+        profit_loss_ratio: float = -average_win / average_loss if average_loss else 0
+        profit_factor: float = -win_pnl.sum() / loss_pnl.sum() if loss_pnl.sum() else 0
+
+        average_holding_bars: float = df["holding_bars"].mean()
+        average_holding_time: timedelta = df["holding_time"].mean().to_pytimedelta()
+        average_mae: float = df["mae"].mean()
+        average_mfe: float = df["mfe"].mean()
+
+        if output:
+            self.output("-" * 30)
+            self.output(_("总交易次数：\t{}").format(round_trip_count))
+            self.output(_("胜率：\t{:,.2f}%").format(win_rate))
+            self.output(_("平均盈利：\t{:,.2f}").format(average_win))
+            self.output(_("平均亏损：\t{:,.2f}").format(average_loss))
+            self.output(_("盈亏比：\t{:,.2f}").format(profit_loss_ratio))
+            self.output(_("利润因子：\t{:,.2f}").format(profit_factor))
+            self.output(_("平均持仓K线：\t{:,.2f}").format(average_holding_bars))
+            self.output(_("平均持仓时间：\t{}").format(average_holding_time))
+            self.output(f"MAE：\t{average_mae:,.2f}")
+            self.output(f"MFE：\t{average_mfe:,.2f}")
+
+        statistics: dict = {
+            "round_trip_count": round_trip_count,
+            "win_count": win_count,
+            "loss_count": loss_count,
+            "win_rate": win_rate,
+            "average_win": average_win,
+            "average_loss": average_loss,
+            "max_win": net_pnl.max(),
+            "max_loss": net_pnl.min(),
+            "profit_loss_ratio": profit_loss_ratio,
+            "profit_factor": profit_factor,
+            "average_holding_bars": average_holding_bars,
+            "average_holding_time": average_holding_time,
+            "average_mae": average_mae,
+            "average_mfe": average_mfe,
+        }
+        return statistics
+
+    def run_cost_analysis(
+        self,
+        rates: list[float] | None = None,
+        slippages: list[float] | None = None,
+        capitals: list[float] | None = None,
+        risk_frees: list[float] | None = None,
+        annual_days: list[int] | None = None
+    ) -> DataFrame:
+        """
+        Calculate statistics of current backtesting trades over all
+        combinations of cost and capital assumptions, without replaying
+        history data again. Current engine parameter is used for the one
+        not given.
+
+        Trades are not affected by these parameters, and daily net pnl is
+        linear with rate and slippage, so all statistics are calculated
+        in one batch.
+        """
+        if not self.daily_results:
+            self.output(_("回测结果为空，无法计算绩效统计指标"))
+            return DataFrame()
+
+        # Commission and slippage with value 1 are daily turnover and volume
+        data: dict = calculate_daily_pnl(
+            list(self.daily_results.values()),
+            list(self.trades.values()),
+            self.size,
+            1,
+            1
+        )
+
+        grid: np.ndarray = np.array(list(product(
+            rates or [self.rate],
+            slippages or [self.slippage],
+            capitals or [self.capital],
+            risk_frees or [self.risk_free],
+            annual_days or [self.annual_days]
+        )), dtype=float)
+
+        rate: np.ndarray = grid[:, 0:1]
+        slippage: np.ndarray = grid[:, 1:2]
+
+        commission: np.ndarray = rate * data["commission"]
+        slippage_cost: np.ndarray = slippage * data["slippage"]
+        net_pnl: np.ndarray = data["total_pnl"] - commission - slippage_cost
+
+        turnover: np.ndarray = np.broadcast_to(data["turnover"], net_pnl.shape)
+        trade_count: np.ndarray = np.broadcast_to(data["trade_count"], net_pnl.shape)
+
+        statistics: dict = calculate_batch_statistics(
+            data["date"],
+            net_pnl,
+            commission,
+            slippage_cost,
+            turnover,
+            trade_count,
+            grid[:, 2],
+            grid[:, 3],
+            grid[:, 4],
+            self.half_life
+        )
+
+        df: DataFrame = DataFrame(
+            grid,
+            columns=["rate", "slippage", "capital", "risk_free", "annual_days"]
+        )
+        for key, value in statistics.items():
+            if key != "capital":
+                df[key] = value
+
+        return df
+
+    def run_bootstrap(
+        self,
+        sample_count: int = 1000,
+        method: str = "block",
+        block_size: int = 5,
+        seed: int | None = None,
+        max_workers: int | None = None,
+        chunk_size: int = 0
+    ) -> DataFrame:
+        """
+        Monte-Carlo bootstrap of current backtesting daily result, return
+        DataFrame of statistics for every sample.
+
+        Method "block" is circular block bootstrap of daily pnl, and method
+        "trade" shuffles the order of trade sequences. Samples are split
+        into chunks calculated in a process pool if more than one chunk,
+        and chunk size is decided by number of days if not given.
+        """
+        if not self.daily_results:
+            self.output(_("回测结果为空，无法计算绩效统计指标"))
+            return DataFrame()
+
+        data: dict = calculate_daily_pnl(
+            list(self.daily_results.values()),
+            list(self.trades.values()),
+            self.size,
+            self.rate,
+            self.slippage
+        )
+        data.pop("trades")
+
+        if not chunk_size:
+            chunk_size = max(BOOTSTRAP_CHUNK_ELEMENTS // len(data["date"]), 1)
+
+        counts: list[int] = [
+            min(chunk_size, sample_count - i) for i in range(0, sample_count, chunk_size)
+        ]
+        seeds: list[np.random.SeedSequence] = np.random.SeedSequence(seed).spawn(len(counts))
+
+        func: Callable = partial(
+            calculate_bootstrap_statistics,
+            method,
+            data,
+            block_size=block_size,
+            capital=self.capital,
+            risk_free=self.risk_free,
+            annual_days=self.annual_days,
+            half_life=self.half_life
+        )
+
+        if len(counts) > 1:
+            with ProcessPoolExecutor(
+                max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results: list[dict] = list(executor.map(
+                    partial(run_bootstrap_chunk, func), counts, seeds
+                ))
+        else:
+            results = [run_bootstrap_chunk(func, count, s) for count, s in zip(counts, seeds, strict=True)]
+
+        df: DataFrame = DataFrame({
+            key: np.concatenate([result[key] for result in results])
+            for key in results[0]
+        })
+        return df
+
+    def show_chart(
+        self,
+        df: DataFrame | None = None,
+        max_points: int = 5000,
+        method: str = "lttb",
+        webgl: bool = False
+    ) -> go.Figure:
+        """
+        Show backtesting result chart.
+
+        Line and bar series longer than max points are downsampled with
+        LTTB or min-max method (0 for no downsampling). WebGL rendering
+        is faster for series with many points. Equity of every bar is also
+        drawn if recorded in backtesting.
+        """
         # Check DataFrame input exterior
         if df is None:
             df = self.daily_df
@@ -502,6 +942,8 @@ class BacktestingEngine:
         if df.empty:
             return
 
+        scatter_class: type = go.Scattergl if webgl else go.Scatter
+
         fig = make_subplots(
             rows=4,
             cols=1,
@@ -509,22 +951,26 @@ class BacktestingEngine:
             vertical_spacing=0.06
         )
 
-        balance_line = go.Scatter(
-            x=df.index,
-            y=df["balance"],
+        balance_ix: np.ndarray = downsample(df["balance"].values, max_points, method)
+        balance_line = scatter_class(
+            x=df.index[balance_ix],
+            y=df["balance"].values[balance_ix],
             mode="lines",
             name="Balance"
         )
 
-        drawdown_scatter = go.Scatter(
-            x=df.index,
-            y=df["drawdown"],
+        drawdown_ix: np.ndarray = downsample(df["drawdown"].values, max_points, method)
+        drawdown_scatter = scatter_class(
+            x=df.index[drawdown_ix],
+            y=df["drawdown"].values[drawdown_ix],
             fillcolor="red",
             fill='tozeroy',
             mode="lines",
             name="Drawdown"
         )
-        pnl_bar = go.Bar(y=df["net_pnl"], name="Daily Pnl")
+
+        pnl_ix: np.ndarray = downsample(df["net_pnl"].values, max_points, "minmax")
+        pnl_bar = go.Bar(x=pnl_ix, y=df["net_pnl"].values[pnl_ix], name="Daily Pnl")
         pnl_histogram = go.Histogram(x=df["net_pnl"], nbinsx=100, name="Days")
 
         fig.add_trace(balance_line, row=1, col=1)
@@ -532,6 +978,29 @@ class BacktestingEngine:
         fig.add_trace(pnl_bar, row=3, col=1)
         fig.add_trace(pnl_histogram, row=4, col=1)
 
+        # Add bar resolution equity and drawdown
+        if self.equity_recorder and self.equity_recorder.count:
+            equity_df: DataFrame = self.equity_recorder.get_df()
+
+            equity_ix: np.ndarray = downsample(equity_df["equity"].values, max_points, method)
+            equity_line = scatter_class(
+                x=equity_df.index[equity_ix],
+                y=equity_df["equity"].values[equity_ix],
+                mode="lines",
+                name="Bar Equity"
+            )
+
+            bar_drawdown_ix: np.ndarray = downsample(equity_df["drawdown"].values, max_points, method)
+            bar_drawdown_line = scatter_class(
+                x=equity_df.index[bar_drawdown_ix],
+                y=equity_df["drawdown"].values[bar_drawdown_ix],
+                mode="lines",
+                name="Bar Drawdown"
+            )
+
+            fig.add_trace(equity_line, row=1, col=1)
+            fig.add_trace(bar_drawdown_line, row=2, col=1)
+
         fig.update_layout(height=1000, width=1000)
         return fig
 
@@ -539,20 +1008,42 @@ class BacktestingEngine:
         self,
         optimization_setting: OptimizationSetting,
         output: bool = True,
-        max_workers: int | None = None
+        max_workers: int | None = None,
+        resume: bool = False,
+        executor: Executor | None = None
     ) -> list:
-        """"""
+        """
+        Run brute force optimization. If resume is True, results are saved
+        into local store, and settings already saved are not run again.
+
+        Executor such as QueueExecutor can be given for running settings
+        with workers on other hosts.
+        """
         if not check_optimization_setting(optimization_setting):
             return []
 
+        store: OptimizationStore | None = None
+        if resume:
+            store = OptimizationStore()
+
         evaluate_func: Callable = wrap_evaluate(self, optimization_setting.target_name)
-        results: list = run_bf_optimization(
-            evaluate_func,
-            optimization_setting,
-            get_target_value,
-            max_workers=max_workers,
-            output=self.output
-        )
+
+        try:
+            results: list = run_bf_optimization(
+                evaluate_func,
+                optimization_setting,
+                get_target_value,
+                max_workers=max_workers,
+                output=self.output,
+                initializer=wrap_init_worker(self),
+                constraints=self.get_constraints(),
+                store=store,
+                study=self.get_study_key(),
+                executor=executor
+            )
+        finally:
+            if store:
+                store.close()
 
         if output:
             for result in results:
@@ -574,9 +1065,13 @@ class BacktestingEngine:
         lambda_: int | None = None,
         cxpb: float = 0.95,
         mutpb: float | None = None,
-        indpb: float = 1.0
+        indpb: float = 1.0,
+        executor: Executor | None = None
     ) -> list:
-        """"""
+        """
+        Run genetic algorithm optimization. Executor such as QueueExecutor
+        can be given for running settings with workers on other hosts.
+        """
         if not check_optimization_setting(optimization_setting):
             return []
 
@@ -586,14 +1081,16 @@ class BacktestingEngine:
             optimization_setting,
             get_target_value,
             max_workers=max_workers,
+            output=self.output,
+            initializer=wrap_init_worker(self),
+            executor=executor,
             pop_size=pop_size,
             ngen=ngen,
             mu=mu,
             lambda_=lambda_,
             cxpb=cxpb,
             mutpb=mutpb,
-            indpb=indpb,
-            output=self.output
+            indpb=indpb
         )
 
         if output:
@@ -603,70 +1100,450 @@ class BacktestingEngine:
 
         return results
 
-    def update_daily_close(self, price: float) -> None:
-        """"""
-        d: Date = self.datetime.date()
+    def run_table_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output: bool = True,
+        max_workers: int | None = None,
+        top_count: int = 10,
+        executor: Executor | None = None
+    ) -> OptimizationTable | None:
+        """
+        Run brute force optimization with results saved in table of NumPy
+        structured array, and statistics dict kept only for top results.
+        """
+        if not check_optimization_setting(optimization_setting):
+            return None
 
-        daily_result: DailyResult | None = self.daily_results.get(d, None)
-        if daily_result:
-            daily_result.close_price = price
-        else:
-            self.daily_results[d] = DailyResult(d, price)
+        evaluate_func: Callable = wrap_evaluate(self, optimization_setting.target_name)
+        table: OptimizationTable = OptimizationTable(optimization_setting, get_target_value, top_count)
 
-    def new_bar(self, bar: BarData) -> None:
-        """"""
-        self.bar = bar
-        self.datetime = bar.datetime
+        results: list = run_bf_optimization(
+            evaluate_func,
+            optimization_setting,
+            get_target_value,
+            max_workers=max_workers,
+            output=self.output,
+            initializer=wrap_init_worker(self),
+            constraints=self.get_constraints(),
+            executor=executor,
+            table=table
+        )
 
-        self.cross_limit_order()
-        self.cross_stop_order()
-        self.strategy.on_bar(bar)
+        if output:
+            for result in results:
+                msg: str = _("参数：{}, 目标：{}").format(result[0], result[1])
+                self.output(msg)
 
-        self.update_daily_close(bar.close_price)
+        return table
 
-    def new_tick(self, tick: TickData) -> None:
-        """"""
-        self.tick = tick
-        self.datetime = tick.datetime
+    def run_bayes_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output: bool = True,
+        max_workers: int | None = None,
+        max_count: int = 0,
+        init_count: int = 0,
+        seed: int | None = None
+    ) -> list:
+        """
+        Run Bayesian optimization, with next batch of settings proposed by
+        surrogate model fitted with finished results.
+        """
+        if not check_optimization_setting(optimization_setting):
+            return []
 
-        self.cross_limit_order()
-        self.cross_stop_order()
-        self.strategy.on_tick(tick)
+        evaluate_func: Callable = wrap_evaluate(self, optimization_setting.target_name)
 
-        self.update_daily_close(tick.last_price)
+        results: list = run_bayes_optimization(
+            evaluate_func,
+            optimization_setting,
+            get_target_value,
+            max_workers=max_workers,
+            output=self.output,
+            initializer=wrap_init_worker(self),
+            constraints=self.get_constraints(),
+            max_count=max_count,
+            init_count=init_count,
+            seed=seed
+        )
 
-    def cross_limit_order(self) -> None:
+        if output:
+            for result in results:
+                msg: str = _("参数：{}, 目标：{}").format(result[0], result[1])
+                self.output(msg)
+
+        return results
+
+    def stream_bf_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        max_workers: int | None = None,
+        top_count: int = 10
+    ) -> OptimizationStream | None:
         """
-        Cross limit order with last bar/tick data.
+        Return iterator of brute force optimization results in finished
+        order, with best results so far kept in its top_results. Call its
+        cancel or break out of the loop to stop optimization.
         """
-        if self.mode == BacktestingMode.BAR:
-            long_cross_price = self.bar.low_price
-            short_cross_price = self.bar.high_price
-            long_best_price = self.bar.open_price
-            short_best_price = self.bar.open_price
-        else:
-            long_cross_price = self.tick.ask_price_1
-            short_cross_price = self.tick.bid_price_1
-            long_best_price = long_cross_price
-            short_best_price = short_cross_price
+        if not check_optimization_setting(optimization_setting):
+            return None
 
-        for order in list(self.active_limit_orders.values()):
-            # Push order update with status "not traded" (pending).
-            if order.status == Status.SUBMITTING:
-                order.status = Status.NOTTRADED
-                self.strategy.on_order(order)
+        evaluate_func: Callable = wrap_evaluate(self, optimization_setting.target_name)
 
-            # Check whether limit orders can be filled.
-            long_cross: bool = (
-                order.direction == Direction.LONG
-                and order.price >= long_cross_price
-                and long_cross_price > 0
-            )
+        return OptimizationStream(
+            evaluate_func,
+            optimization_setting,
+            get_target_value,
+            max_workers=max_workers,
+            output=self.output,
+            initializer=wrap_init_worker(self),
+            constraints=self.get_constraints(),
+            top_count=top_count
+        )
 
-            short_cross: bool = (
-                order.direction == Direction.SHORT
-                and order.price <= short_cross_price
-                and short_cross_price > 0
+    def run_halving_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output: bool = True,
+        max_workers: int | None = None,
+        eta: int = 3,
+        min_fraction: float = 0.1
+    ) -> list:
+        """
+        Run successive halving optimization, with weak settings dropped after
+        running on part of history data. Surviving settings continue from
+        checkpoint of engine state instead of restarting.
+        """
+        if not check_optimization_setting(optimization_setting):
+            return []
+
+        evaluate_func: Callable = wrap_evaluate(
+            self,
+            optimization_setting.target_name,
+            evaluate_stage
+        )
+
+        results: list = run_halving_optimization(
+            evaluate_func,
+            optimization_setting,
+            get_target_value,
+            max_workers=max_workers,
+            output=self.output,
+            initializer=wrap_init_worker(self),
+            constraints=self.get_constraints(),
+            eta=eta,
+            min_fraction=min_fraction
+        )
+
+        if output:
+            for result in results:
+                msg: str = _("参数：{}, 目标：{}").format(result[0], result[1])
+                self.output(msg)
+
+        return results
+
+    def run_wf_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        train_days: int,
+        test_days: int,
+        output: bool = True,
+        max_workers: int | None = None
+    ) -> DataFrame:
+        """
+        Run walk forward analysis over history data loaded once.
+
+        Settings are optimized on train_days of in sample data, and the best
+        one is run on following test_days of out of sample data, with window
+        moved forward by test_days each time. Daily results of all out of
+        sample windows are joined as daily_df of the engine, and window
+        results are returned.
+        """
+        if not check_optimization_setting(optimization_setting):
+            return DataFrame()
+
+        if not self.history_data:
+            self.load_data()
+
+        windows: list[tuple[tuple, tuple]] = self.get_wf_windows(train_days, test_days)
+        if not windows:
+            self.output(_("历史数据天数不足，无法划分滚动窗口"))
+            return DataFrame()
+
+        evaluate_func: Callable = wrap_evaluate(
+            self,
+            optimization_setting.target_name,
+            evaluate_window
+        )
+
+        results: list[tuple[tuple, tuple]] = run_wf_optimization(
+            evaluate_func,
+            optimization_setting,
+            windows,
+            get_target_value,
+            max_workers=max_workers,
+            output=self.output,
+            initializer=wrap_init_worker(self),
+            constraints=self.get_constraints()
+        )
+        if not results:
+            return DataFrame()
+
+        rows: list[dict] = []
+        daily_dfs: list[DataFrame] = []
+
+        for (train_window, test_window), (train_result, test_result) in zip(windows, results, strict=True):
+            rows.append({
+                "train_start": train_window[2].date(),
+                "train_end": train_window[3].date(),
+                "test_start": test_window[2].date(),
+                "test_end": test_window[3].date(),
+                "setting": train_result[0],
+                "train_target": train_result[1],
+                "test_target": test_result[1]
+            })
+
+            if output:
+                msg: str = _("样本外区间：{}至{}，参数：{}，样本内目标：{}，样本外目标：{}").format(
+                    test_window[2].date(),
+                    test_window[3].date(),
+                    train_result[0],
+                    train_result[1],
+                    test_result[1]
+                )
+                self.output(msg)
+
+            daily_dfs.append(test_result[3])
+
+        self.daily_df = concat(daily_dfs)
+        self.calculate_statistics(output=output)
+
+        return DataFrame(rows)
+
+    def get_wf_windows(self, train_days: int, test_days: int) -> list[tuple[tuple, tuple]]:
+        """
+        Split loaded history data into (in sample, out of sample) windows.
+
+        Each window is (start index, end index, start, end) in history data,
+        with days counted by dates having data.
+        """
+        dates: list[Date] = []
+        indexes: list[int] = []
+
+        for ix, data in enumerate(self.history_data):
+            d: Date = data.datetime.date()
+            if not dates or d != dates[-1]:
+                dates.append(d)
+                indexes.append(ix)
+
+        indexes.append(len(self.history_data))
+
+        def get_window(start_day: int, end_day: int) -> tuple:
+            start: datetime = datetime.combine(dates[start_day], time())
+            end: datetime = datetime.combine(dates[end_day - 1], time.max)
+            return (indexes[start_day], indexes[end_day], start, end)
+
+        windows: list[tuple[tuple, tuple]] = []
+
+        i: int = 0
+        while i + train_days < len(dates):
+            test_end: int = min(i + train_days + test_days, len(dates))
+
+            windows.append((
+                get_window(i, i + train_days),
+                get_window(i + train_days, test_end)
+            ))
+            i += test_days
+
+        return windows
+
+    def save_checkpoint(self, path: Path) -> bool:
+        """
+        Save pickled engine state without history data into file, return
+        False if strategy state cannot be pickled.
+        """
+        history_data: list = self.history_data
+        history_arrays: dict[str, np.ndarray] = self.history_arrays
+
+        self.history_data = []
+        self.history_arrays = {}
+
+        try:
+            with open(path, "wb") as f:
+                pickle.dump(self, f)
+            return True
+        except (pickle.PicklingError, TypeError, AttributeError):
+            path.unlink(missing_ok=True)
+            return False
+        finally:
+            self.history_data = history_data
+            self.history_arrays = history_arrays
+
+    def run_scenario_analysis(
+        self,
+        split_dt: datetime,
+        settings: list[dict],
+        max_workers: int | None = None
+    ) -> list[tuple[dict, dict]]:
+        """
+        Replay history data before split datetime once, then finish the
+        backtesting with each setting and return (setting, statistics) list.
+
+        On platforms supporting fork, every setting is run in a child process
+        forked after the shared replay, so the engine state is inherited by
+        copy-on-write. Otherwise a deep copy of the engine is used for each
+        setting.
+
+        Only parameters used after on_init are affected by the new setting,
+        for example stop or exit parameters checked in on_bar.
+        """
+        # Naive split datetime is taken as in time zone of history data
+        tz: tzinfo | None = self.history_data[0].datetime.tzinfo if self.history_data else None
+        if split_dt.tzinfo is None or tz is None:
+            split_dt = split_dt.replace(tzinfo=tz)
+
+        split_ix: int = bisect_left(self.history_data, split_dt, key=lambda data: data.datetime)
+
+        self.start_backtesting()
+        if not self.replay_data(self.history_data[:split_ix]):
+            return []
+        self.output(_("共享历史数据回放结束，开始运行{}个情景").format(len(settings)))
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            results: list[tuple[dict, dict]] = []
+
+            # History data is shared by all copies
+            memo: dict = {
+                id(self.history_data): self.history_data,
+                id(self.history_arrays): self.history_arrays
+            }
+
+            for setting in settings:
+                engine: BacktestingEngine = deepcopy(self, memo.copy())
+                results.append(engine.run_scenario(setting, split_ix))
+
+            return results
+
+        ctx = multiprocessing.get_context("fork")
+        max_workers = max_workers or os.cpu_count() or 1
+
+        fork_results: list = [None] * len(settings)
+        pending: list[tuple[int, dict]] = list(enumerate(settings))
+        running: dict[Connection, tuple[int, Any]] = {}
+
+        while pending or running:
+            while pending and len(running) < max_workers:
+                ix, setting = pending.pop(0)
+
+                reader, writer = ctx.Pipe(duplex=False)
+                process = ctx.Process(
+                    target=run_forked_scenario,
+                    args=(self, setting, split_ix, writer)
+                )
+                process.start()
+                writer.close()
+
+                running[reader] = (ix, process)
+
+            for ready in wait(list(running)):
+                reader = cast(Connection, ready)
+                ix, process = running.pop(reader)
+
+                try:
+                    fork_results[ix] = reader.recv()
+                except EOFError:
+                    self.output(_("情景运行失败：{}").format(settings[ix]))
+                    fork_results[ix] = (settings[ix], {})
+
+                reader.close()
+                process.join()
+
+        return fork_results
+
+    def run_scenario(self, setting: dict, start_ix: int) -> tuple[dict, dict]:
+        """
+        Update strategy setting and finish backtesting from start index.
+        """
+        self.strategy.update_setting(setting)
+
+        if self.replay_data(self.history_data[start_ix:], False):
+            self.stop_backtesting()
+
+        self.calculate_result()
+        statistics: dict = self.calculate_statistics(output=False)
+        return setting, statistics
+
+    def update_daily_close(self, price: float) -> None:
+        """"""
+        d: Date = self.datetime.date()
+
+        daily_result: DailyResult | None = self.daily_results.get(d, None)
+        if daily_result:
+            daily_result.close_price = price
+        else:
+            self.daily_results[d] = DailyResult(d, price)
+
+    def new_bar(self, bar: BarData) -> None:
+        """"""
+        self.bar = bar
+        self.datetime = bar.datetime
+
+        self.cross_limit_order()
+        self.cross_stop_order()
+        self.strategy.on_bar(bar)
+
+        self.update_daily_close(bar.close_price)
+
+        if self.equity_recorder:
+            self.equity_recorder.update_price(bar.datetime, bar.close_price)
+
+    def new_tick(self, tick: TickData) -> None:
+        """"""
+        self.tick = tick
+        self.datetime = tick.datetime
+
+        self.cross_limit_order()
+        self.cross_stop_order()
+        self.strategy.on_tick(tick)
+
+        self.update_daily_close(tick.last_price)
+
+        if self.equity_recorder:
+            self.equity_recorder.update_price(tick.datetime, tick.last_price)
+
+    def cross_limit_order(self) -> None:
+        """
+        Cross limit order with last bar/tick data.
+        """
+        if self.mode == BacktestingMode.BAR:
+            long_cross_price = self.bar.low_price
+            short_cross_price = self.bar.high_price
+            long_best_price = self.bar.open_price
+            short_best_price = self.bar.open_price
+        else:
+            long_cross_price = self.tick.ask_price_1
+            short_cross_price = self.tick.bid_price_1
+            long_best_price = long_cross_price
+            short_best_price = short_cross_price
+
+        for order in list(self.active_limit_orders.values()):
+            # Push order update with status "not traded" (pending).
+            if order.status == Status.SUBMITTING:
+                order.status = Status.NOTTRADED
+                self.strategy.on_order(order)
+
+            # Check whether limit orders can be filled.
+            long_cross: bool = (
+                order.direction == Direction.LONG
+                and order.price >= long_cross_price
+                and long_cross_price > 0
+            )
+
+            short_cross: bool = (
+                order.direction == Direction.SHORT
+                and order.price <= short_cross_price
+                and short_cross_price > 0
             )
 
             if not long_cross and not short_cross:
@@ -708,6 +1585,9 @@ class BacktestingEngine:
 
             self.trades[trade.vt_tradeid] = trade
 
+            if self.equity_recorder:
+                self.equity_recorder.update_trade(trade)
+
     def cross_stop_order(self) -> None:
         """
         Cross stop order with last bar/tick data.
@@ -782,6 +1662,9 @@ class BacktestingEngine:
 
             self.trades[trade.vt_tradeid] = trade
 
+            if self.equity_recorder:
+                self.equity_recorder.update_trade(trade)
+
             # Update stop order.
             stop_order.vt_orderids.append(order.vt_orderid)
             stop_order.status = StopOrderStatus.TRIGGERED
@@ -820,6 +1703,16 @@ class BacktestingEngine:
             init_end
         )
 
+        if not bars:
+            bars = load_resampled_bar_data(
+                symbol,
+                exchange,
+                interval,
+                init_start,
+                init_end,
+                self.daily_end
+            )
+
         return bars
 
     def load_tick(self, vt_symbol: str, days: int, callback: Callable) -> list[TickData]:
@@ -956,8 +1849,7 @@ class BacktestingEngine:
         """
         Write log message.
         """
-        msg = f"{self.datetime}\t{msg}"
-        self.logs.append(msg)
+        self.logs.write(self.datetime, msg)
 
     def send_email(self, msg: str, strategy: CtaTemplate | None = None) -> None:
         """
@@ -977,6 +1869,255 @@ class BacktestingEngine:
         """
         return self.engine_type
 
+    def get_indicator(self, strategy: CtaTemplate, bar: BarData, name: str, *args: Any) -> Any:
+        """
+        Return indicator value of the bar.
+
+        The full indicator array is calculated once over history data with
+        the ArrayManager method of the same name, and then shared by every
+        backtesting run on the same data in this process.
+
+        Value is looked up by bar datetime, so None is returned for bars not
+        in history data (e.g. bars loaded for strategy init), or bars of other
+        interval (e.g. window bars from BarGenerator). None is also returned
+        before enough history bars for the indicator, as bars loaded for
+        strategy init are not included in calculation.
+
+        Indicators with recursive smoothing (e.g. atr, rsi) are calculated
+        over the whole history instead of latest 100 bars in ArrayManager,
+        so their values are not the same as from ArrayManager of strategy.
+        """
+        if self.mode != BacktestingMode.BAR or bar.interval != self.interval:
+            return None
+
+        timestamps: np.ndarray = self.get_history_arrays()["datetime"]
+        timestamp: float = bar.datetime.timestamp()
+
+        ix: int = int(np.searchsorted(timestamps, timestamp))
+        if ix == len(timestamps) or timestamps[ix] != timestamp:
+            return None
+
+        key: tuple = (name, args, self.get_data_fingerprint())
+
+        result: Any = indicator_cache.get(key, None)
+        if result is None:
+            result = self.calculate_indicator(name, args)
+
+            if len(indicator_cache) >= INDICATOR_CACHE_SIZE:
+                indicator_cache.pop(next(iter(indicator_cache)))
+            indicator_cache[key] = result
+
+        if isinstance(result, tuple):
+            values: tuple[float, ...] = tuple(float(array[ix]) for array in result)
+            if any(np.isnan(values)):
+                return None
+            return values
+
+        value: float = float(result[ix])
+        if np.isnan(value):
+            return None
+        return value
+
+    def calculate_indicator(self, name: str, args: tuple) -> Any:
+        """
+        Calculate full indicator array over history data.
+        """
+        arrays: dict[str, np.ndarray] = self.get_history_arrays()
+
+        am: ArrayManager = ArrayManager(len(self.history_data))
+        am.open_array = arrays["open_price"]
+        am.high_array = arrays["high_price"]
+        am.low_array = arrays["low_price"]
+        am.close_array = arrays["close_price"]
+        am.volume_array = arrays["volume"]
+        am.turnover_array = arrays["turnover"]
+        am.open_interest_array = arrays["open_interest"]
+
+        func: Callable = getattr(am, name)
+        return func(*args, array=True)
+
+    def get_history_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Return history data converted into NumPy arrays.
+        """
+        if not self.history_arrays:
+            if self.mode == BacktestingMode.BAR:
+                fields: list[str] = [
+                    "open_price",
+                    "high_price",
+                    "low_price",
+                    "close_price",
+                    "volume",
+                    "turnover",
+                    "open_interest"
+                ]
+            else:
+                fields = [
+                    "last_price",
+                    "volume",
+                    "turnover",
+                    "open_interest",
+                    "bid_price_1",
+                    "ask_price_1"
+                ]
+
+            self.history_arrays["datetime"] = np.array(
+                [data.datetime.timestamp() for data in self.history_data],
+                dtype=float
+            )
+
+            for field in fields:
+                self.history_arrays[field] = np.array(
+                    [getattr(data, field) for data in self.history_data],
+                    dtype=float
+                )
+
+        return self.history_arrays
+
+    def get_data_fingerprint(self) -> str:
+        """
+        Return hash value identifying loaded history data.
+        """
+        if not self.data_fingerprint:
+            hasher = hashlib.sha1()
+            hasher.update(f"{self.vt_symbol}|{self.interval}|{self.mode}".encode())
+
+            for array in self.get_history_arrays().values():
+                hasher.update(array.tobytes())
+
+            self.data_fingerprint = hasher.hexdigest()
+
+        return self.data_fingerprint
+
+    def get_study_key(self) -> str:
+        """
+        Return hash value identifying optimization of strategy class with
+        history data range and engine parameters.
+
+        Microsecond of end is dropped, for end defaults to current time.
+        """
+        try:
+            source: str = inspect.getsource(self.strategy_class)
+        except (OSError, TypeError):
+            source = self.strategy_class.__qualname__
+
+        hasher = hashlib.sha1()
+        hasher.update(f"{self.strategy_class.__module__}.{self.strategy_class.__qualname__}".encode())
+        hasher.update(source.encode())
+        hasher.update(repr((
+            self.vt_symbol,
+            self.interval,
+            self.start,
+            self.end.replace(microsecond=0),
+            self.rate,
+            self.slippage,
+            self.size,
+            self.pricetick,
+            self.capital,
+            self.mode,
+            self.daily_end
+        )).encode())
+        return hasher.hexdigest()
+
+    def get_cache_key(self) -> str:
+        """
+        Return hash value identifying backtesting result, which is empty
+        if source code of strategy class is not available.
+        """
+        try:
+            source: str = inspect.getsource(self.strategy_class)
+        except (OSError, TypeError):
+            return ""
+
+        hasher = hashlib.sha1()
+        hasher.update(source.encode())
+        hasher.update(repr(sorted(self.strategy.get_parameters().items())).encode())
+        hasher.update(repr((
+            self.rate,
+            self.slippage,
+            self.size,
+            self.pricetick,
+            self.capital,
+            self.mode,
+            self.daily_end
+        )).encode())
+        hasher.update(self.get_data_fingerprint().encode())
+        return hasher.hexdigest()
+
+    def save_cached_result(self, cache_key: str) -> None:
+        """
+        Save trades and daily close prices of backtesting into cache file.
+        """
+        trades: list[TradeData] = list(self.trades.values())
+
+        # Price and volume types are kept, so that loaded result is identical
+        data: dict[str, np.ndarray] = {
+            "trade_datetime": np.array([trade.datetime.timestamp() for trade in trades], dtype=float),   # type: ignore
+            "trade_long": np.array([trade.direction == Direction.LONG for trade in trades], dtype=bool),
+            "trade_offset": np.array([trade.offset.value for trade in trades], dtype=str),
+            "trade_price": np.array([trade.price for trade in trades]),
+            "trade_volume": np.array([trade.volume for trade in trades]),
+            "trade_orderid": np.array([trade.orderid for trade in trades], dtype=str),
+            "trade_tradeid": np.array([trade.tradeid for trade in trades], dtype=str),
+            "daily_date": np.array([d.toordinal() for d in self.daily_results], dtype=int),
+            "daily_close": np.array([r.close_price for r in self.daily_results.values()]),
+        }
+
+        # Write into temp file first, for other process may read the same file
+        folder_path: Path = get_folder_path(RESULT_CACHE_FOLDER)
+        file_path: Path = folder_path.joinpath(f"{cache_key}.npz")
+        temp_path: Path = folder_path.joinpath(f"{cache_key}.{os.getpid()}.tmp")
+
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, **data)                     # type: ignore
+        os.replace(temp_path, file_path)
+
+    def load_cached_result(self, cache_key: str) -> bool:
+        """
+        Load trades and daily close prices of backtesting from cache file.
+        """
+        file_path: Path = get_folder_path(RESULT_CACHE_FOLDER).joinpath(f"{cache_key}.npz")
+        if not file_path.exists():
+            return False
+
+        with np.load(file_path) as data:
+            tz: tzinfo | None = self.history_data[0].datetime.tzinfo if self.history_data else None
+
+            for timestamp, long, offset, price, volume, orderid, tradeid in zip(
+                data["trade_datetime"].tolist(),
+                data["trade_long"].tolist(),
+                data["trade_offset"].tolist(),
+                data["trade_price"].tolist(),
+                data["trade_volume"].tolist(),
+                data["trade_orderid"].tolist(),
+                data["trade_tradeid"].tolist(),
+                strict=True
+            ):
+                trade: TradeData = TradeData(
+                    symbol=self.symbol,
+                    exchange=self.exchange,
+                    orderid=orderid,
+                    tradeid=tradeid,
+                    direction=Direction.LONG if long else Direction.SHORT,
+                    offset=Offset(offset),
+                    price=price,
+                    volume=volume,
+                    datetime=datetime.fromtimestamp(timestamp, tz),
+                    gateway_name=self.gateway_name,
+                )
+                self.trades[trade.vt_tradeid] = trade
+
+            for ordinal, close_price in zip(
+                data["daily_date"].tolist(),
+                data["daily_close"].tolist(),
+                strict=True
+            ):
+                d: Date = Date.fromordinal(ordinal)
+                self.daily_results[d] = DailyResult(d, close_price)
+
+        self.trade_count = len(self.trades)
+        return True
+
     def get_pricetick(self, strategy: CtaTemplate) -> float:
         """
         Return contract pricetick data.
@@ -1017,9 +2158,432 @@ class BacktestingEngine:
         """
         Return all daily result data.
         """
+        # Fill daily result objects with values calculated in daily_df,
+        # skipping columns added by calculate_statistics
+        if not self.daily_df.empty:
+            fields: list[str] = [
+                name for name in DailyResult(Date.min, 0).__dict__
+                if name in self.daily_df.columns
+            ]
+            columns: list[list] = [self.daily_df[name].tolist() for name in fields]
+
+            for ix, d in enumerate(self.daily_df.index):
+                daily_result: DailyResult | None = self.daily_results.get(d, None)
+                if daily_result:
+                    for name, values in zip(fields, columns, strict=True):
+                        setattr(daily_result, name, values[ix])
+
         return list(self.daily_results.values())
 
 
+class LogBuffer:
+    """
+    Log storage of backtesting engine.
+
+    Log record is saved as (datetime, level, msg) tuple and formatted into
+    text only when read. Size limits number of records saved: new records
+    are dropped when full, or the oldest ones are replaced in ring mode.
+    Nothing is saved if disabled.
+    """
+
+    def __init__(
+        self,
+        size: int | None = None,
+        ring: bool = False,
+        enabled: bool = True
+    ) -> None:
+        """"""
+        self.size: int | None = size
+        self.ring: bool = ring
+        self.enabled: bool = enabled
+
+        maxlen: int | None = size if ring else None
+        self.records: deque[tuple[datetime | None, int, str]] = deque(maxlen=maxlen)
+        self.dropped: int = 0
+
+    def write(self, dt: datetime | None, msg: str, level: int = INFO) -> None:
+        """
+        Save new log record.
+        """
+        if not self.enabled:
+            return
+
+        if self.size is not None and len(self.records) >= self.size:
+            self.dropped += 1
+            if not self.ring:
+                return
+
+        self.records.append((dt, level, msg))
+
+    def format_record(self, record: tuple[datetime | None, int, str]) -> str:
+        """
+        Convert log record into text.
+        """
+        dt, _level, msg = record
+        return f"{dt}\t{msg}"
+
+    def get_logs(self) -> list[str]:
+        """
+        Return text of all log records.
+        """
+        return [self.format_record(record) for record in self.records]
+
+    def clear(self) -> None:
+        """
+        Clear all log records.
+        """
+        self.records.clear()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[str]:
+        """"""
+        for record in self.records:
+            yield self.format_record(record)
+
+    def __getitem__(self, ix: int | slice) -> str | list[str]:
+        """
+        Return text of log record, or list of texts if sliced.
+        """
+        if isinstance(ix, slice):
+            records: deque[tuple[datetime | None, int, str]] = self.records
+            return [self.format_record(records[i]) for i in range(*ix.indices(len(records)))]
+
+        return self.format_record(self.records[ix])
+
+
+class EquityRecorder:
+    """
+    Record mark-to-market equity and position at every bar/tick into
+    preallocated arrays during backtesting.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        capital: float,
+        size: float,
+        rate: float,
+        slippage: float
+    ) -> None:
+        """"""
+        self.capital: float = capital
+        self.size: float = size
+        self.rate: float = rate
+        self.slippage: float = slippage
+
+        self.pos: float = 0
+        self.cash: float = 0
+        self.cost: float = 0
+
+        self.count: int = 0
+        self.tzinfo: tzinfo | None = None
+
+        capacity = max(capacity, 1)
+        self.timestamp_array: np.ndarray = np.zeros(capacity)
+        self.equity_array: np.ndarray = np.zeros(capacity)
+        self.pos_array: np.ndarray = np.zeros(capacity)
+
+    def update_trade(self, trade: TradeData) -> None:
+        """
+        Update position, cash and cost with new trade.
+        """
+        turnover: float = trade.volume * self.size * trade.price
+
+        if trade.direction == Direction.LONG:
+            self.pos += trade.volume
+            self.cash -= turnover
+        else:
+            self.pos -= trade.volume
+            self.cash += turnover
+
+        self.cost += turnover * self.rate + trade.volume * self.size * self.slippage
+
+    def update_price(self, dt: datetime, price: float) -> None:
+        """
+        Record equity and position marked to latest price.
+        """
+        ix: int = self.count
+
+        if ix == len(self.equity_array):
+            self.timestamp_array = np.resize(self.timestamp_array, ix * 2)
+            self.equity_array = np.resize(self.equity_array, ix * 2)
+            self.pos_array = np.resize(self.pos_array, ix * 2)
+        elif not ix:
+            self.tzinfo = dt.tzinfo
+
+        self.timestamp_array[ix] = dt.timestamp()
+        self.equity_array[ix] = self.capital + self.cash + self.pos * price * self.size - self.cost
+        self.pos_array[ix] = self.pos
+
+        self.count += 1
+
+    def get_datetime(self, ix: int) -> datetime:
+        """
+        Return datetime of record at index.
+        """
+        return datetime.fromtimestamp(self.timestamp_array[ix], self.tzinfo)
+
+    def get_df(self, max_points: int = 0) -> DataFrame:
+        """
+        Return DataFrame of equity, drawdown and position with datetime index.
+        Downsample to max points with min-max method if max points given.
+        """
+        count: int = self.count
+        equity: np.ndarray = self.equity_array[:count]
+
+        _highlevel, drawdown, ddpercent = calculate_drawdown(equity)
+
+        if max_points and count > max_points:
+            ix: np.ndarray = downsample_min_max(equity, max_points)
+        else:
+            ix = np.arange(count)
+
+        index: DatetimeIndex = to_datetime(self.timestamp_array[ix], unit="s", utc=True)
+        if self.tzinfo:
+            index = index.tz_convert(self.tzinfo)
+
+        df: DataFrame = DataFrame(
+            {
+                "equity": equity[ix],
+                "drawdown": drawdown[ix],
+                "ddpercent": ddpercent[ix],
+                "pos": self.pos_array[ix]
+            },
+            index=index
+        )
+        return df
+
+    def calculate_statistics(self) -> dict:
+        """
+        Calculate intraday drawdown statistics from equity records.
+        """
+        if not self.count:
+            return {}
+
+        equity: np.ndarray = self.equity_array[:self.count]
+        _highlevel, drawdown, ddpercent = calculate_drawdown(equity)
+
+        max_drawdown_end: int = int(drawdown.argmin())
+        max_drawdown_start: int = int(equity[:max_drawdown_end + 1].argmax())
+
+        statistics: dict = {
+            "end_equity": equity[-1],
+            "max_equity": equity.max(),
+            "min_equity": equity.min(),
+            "max_drawdown": drawdown[max_drawdown_end],
+            "max_ddpercent": ddpercent.min(),
+            "max_drawdown_start": self.get_datetime(max_drawdown_start),
+            "max_drawdown_end": self.get_datetime(max_drawdown_end),
+            "max_drawdown_bars": max_drawdown_end - max_drawdown_start,
+            "max_pos": self.pos_array[:self.count].max(),
+            "min_pos": self.pos_array[:self.count].min(),
+        }
+        return statistics
+
+
+class PortfolioAnalyzer:
+    """
+    Combine daily results of many backtestings with weights.
+
+    Daily results are aligned on common dates into matrices once when
+    created, then statistics of many weight vectors are calculated in one
+    batch. Each weight scales the position of one backtesting, so pnl is
+    multiplied by weight and cost by its absolute value.
+    """
+
+    def __init__(self, engines: list[BacktestingEngine]) -> None:
+        """"""
+        self.engines: list[BacktestingEngine] = engines
+
+        results: list[dict] = [
+            calculate_daily_pnl(
+                list(engine.daily_results.values()),
+                list(engine.trades.values()),
+                engine.size,
+                engine.rate,
+                engine.slippage
+            )
+            for engine in engines
+        ]
+
+        # Union of dates from all results
+        ordinals: np.ndarray = np.unique(np.concatenate(
+            [[d.toordinal() for d in result["date"]] for result in results] or [[]]
+        )).astype(int)
+        self.dates: list[Date] = [Date.fromordinal(ordinal) for ordinal in ordinals.tolist()]
+
+        shape: tuple[int, int] = (len(engines), len(self.dates))
+        self.total_pnl: np.ndarray = np.zeros(shape)
+        self.commission: np.ndarray = np.zeros(shape)
+        self.slippage: np.ndarray = np.zeros(shape)
+        self.turnover: np.ndarray = np.zeros(shape)
+        self.trade_count: np.ndarray = np.zeros(shape)
+
+        for i, result in enumerate(results):
+            columns: np.ndarray = np.searchsorted(
+                ordinals,
+                [d.toordinal() for d in result["date"]]
+            )
+
+            self.total_pnl[i, columns] = result["total_pnl"]
+            self.commission[i, columns] = result["commission"]
+            self.slippage[i, columns] = result["slippage"]
+            self.turnover[i, columns] = result["turnover"]
+            self.trade_count[i, columns] = result["trade_count"]
+
+    def calculate_net_pnl(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Return (weights x days) daily net pnl of combined portfolio.
+        """
+        weights = np.atleast_2d(weights)
+        abs_weights: np.ndarray = np.abs(weights)
+
+        net_pnl: np.ndarray = weights @ self.total_pnl - abs_weights @ (self.commission + self.slippage)
+        return net_pnl
+
+    def calculate_statistics(
+        self,
+        weights: np.ndarray,
+        capital: float | None = None,
+        risk_free: float = 0,
+        annual_days: int = 240,
+        half_life: int = 120
+    ) -> DataFrame:
+        """
+        Calculate statistics of portfolio for each row of (candidates x
+        backtestings) weights array. Sum of backtesting capital is used if
+        capital not given.
+        """
+        weights = np.atleast_2d(weights)
+        abs_weights: np.ndarray = np.abs(weights)
+
+        if capital is None:
+            capital = sum(engine.capital for engine in self.engines)
+
+        statistics: dict = calculate_batch_statistics(
+            self.dates,
+            self.calculate_net_pnl(weights),
+            abs_weights @ self.commission,
+            abs_weights @ self.slippage,
+            abs_weights @ self.turnover,
+            (weights != 0) @ self.trade_count,
+            capital,
+            risk_free,
+            annual_days,
+            half_life
+        )
+        return DataFrame(statistics)
+
+    def calculate_balance(self, weights: np.ndarray, capital: float | None = None) -> DataFrame:
+        """
+        Return DataFrame of balance and drawdown of one weight vector.
+        """
+        if capital is None:
+            capital = sum(engine.capital for engine in self.engines)
+
+        net_pnl: np.ndarray = self.calculate_net_pnl(weights)[0]
+        balance: np.ndarray = np.cumsum(net_pnl) + capital
+        highlevel, drawdown, ddpercent = calculate_drawdown(balance)
+
+        df: DataFrame = DataFrame(
+            {
+                "net_pnl": net_pnl,
+                "balance": balance,
+                "highlevel": highlevel,
+                "drawdown": drawdown,
+                "ddpercent": ddpercent
+            },
+            index=self.dates
+        )
+        return df
+
+
+def downsample(values: np.ndarray, max_points: int, method: str = "lttb") -> np.ndarray:
+    """
+    Return index of points kept after downsampling with LTTB or min-max
+    method. All points are kept if not more than max points.
+    """
+    if not max_points or len(values) <= max_points:
+        return np.arange(len(values))
+
+    if method == "minmax":
+        return downsample_min_max(values, max_points)
+    return downsample_lttb(values, max_points)
+
+
+def downsample_lttb(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Return sorted index of points kept with Largest-Triangle-Three-Buckets
+    downsampling, which keeps the visual shape of line chart.
+    """
+    count: int = len(values)
+    if count <= max_points or max_points < 3:
+        return np.arange(count)
+
+    # First and last points are always kept
+    every: float = (count - 2) / (max_points - 2)
+    edges: np.ndarray = (np.arange(max_points - 1) * every).astype(int) + 1
+    edges[-1] = count - 1
+
+    result: np.ndarray = np.zeros(max_points, dtype=int)
+    result[-1] = count - 1
+    a: int = 0
+
+    for i in range(max_points - 2):
+        start: int = edges[i]
+        end: int = edges[i + 1]
+
+        # Average point of next bucket, which is the last point for last bucket
+        next_end: int = edges[i + 2] if i + 2 < len(edges) else count
+        avg_x: float = (end + next_end - 1) / 2
+        avg_y: float = values[end:next_end].mean()
+
+        # Choose point forming largest triangle with last kept point and average
+        x: np.ndarray = np.arange(start, end)
+        area: np.ndarray = np.abs(
+            (a - avg_x) * (values[start:end] - values[a])
+            - (a - x) * (avg_y - values[a])
+        )
+
+        a = start + int(area.argmax())
+        result[i + 1] = a
+
+    return result
+
+
+def downsample_min_max(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Return sorted index of points kept after downsampling, with the first,
+    last and the min and max points of each bucket, so peaks are not lost.
+    """
+    count: int = len(values)
+    if count <= max_points or max_points < 4:
+        return np.arange(count)
+
+    # Split points between first and last into buckets of same size
+    inner: np.ndarray = values[1:-1]
+    bucket_count: int = (max_points - 2) // 2
+    bucket_size: int = -(-len(inner) // bucket_count)
+
+    padded: np.ndarray = np.full(bucket_count * bucket_size, np.nan)
+    padded[:len(inner)] = inner
+    buckets: np.ndarray = padded.reshape(bucket_count, bucket_size)
+
+    # Bucket with only padding values is dropped
+    valid: np.ndarray = np.arange(bucket_count) * bucket_size < len(inner)
+    buckets = buckets[valid]
+    offsets: np.ndarray = np.flatnonzero(valid) * bucket_size + 1
+
+    min_ix: np.ndarray = np.nanargmin(buckets, axis=1) + offsets
+    max_ix: np.ndarray = np.nanargmax(buckets, axis=1) + offsets
+
+    return np.unique(np.concatenate([[0], min_ix, max_ix, [count - 1]]))
+
+
 class DailyResult:
     """"""
 
@@ -1094,6 +2658,124 @@ class DailyResult:
         self.net_pnl = self.total_pnl - self.commission - self.slippage
 
 
+def calculate_daily_df(
+    daily_results: list[DailyResult],
+    trades: list[TradeData],
+    size: float,
+    rate: float,
+    slippage: float
+) -> DataFrame:
+    """
+    Calculate daily pnl DataFrame, with date as index.
+    """
+    data: dict = calculate_daily_pnl(daily_results, trades, size, rate, slippage)
+    return DataFrame(data).set_index("date")
+
+
+def calculate_daily_pnl(
+    daily_results: list[DailyResult],
+    trades: list[TradeData],
+    size: float,
+    rate: float,
+    slippage: float
+) -> dict:
+    """
+    Calculate daily pnl with NumPy, the result is the same as calling
+    DailyResult.calculate_pnl day by day.
+
+    Trades are mapped to days with searchsorted and summed with bincount,
+    which adds values one by one in trade order, so the floating point
+    result is identical to the iteration.
+    """
+    day_count: int = len(daily_results)
+
+    dates: list[Date] = [daily_result.date for daily_result in daily_results]
+    close_price: np.ndarray = np.array([r.close_price for r in daily_results], dtype=float)
+
+    # If no pre_close provided on the first day,
+    # use value 1 to avoid zero division error
+    pre_close: np.ndarray = np.append(0, close_price[:-1])
+    pre_close[pre_close == 0] = 1
+
+    # Map trades into day index
+    day_ordinals: np.ndarray = np.array([d.toordinal() for d in dates])
+    trade_ordinals: np.ndarray = np.array(
+        [trade.datetime.date().toordinal() for trade in trades],        # type: ignore
+        dtype=int
+    )
+    trade_days: np.ndarray = np.searchsorted(day_ordinals, trade_ordinals)
+
+    # Keep the type of price and volume, which is int if all values are int
+    trade_price: np.ndarray = np.array([trade.price for trade in trades] or [0])[:len(trades)]
+    trade_volume: np.ndarray = np.array([trade.volume for trade in trades] or [0])[:len(trades)]
+    pos_change: np.ndarray = np.where(
+        [trade.direction == Direction.LONG for trade in trades],
+        trade_volume,
+        -trade_volume
+    )
+
+    trade_count: np.ndarray = np.bincount(trade_days, minlength=day_count)
+
+    # Position is changed by trades one by one
+    offsets: np.ndarray = np.append(0, np.cumsum(trade_count))
+    pos: np.ndarray = np.append(0, np.cumsum(pos_change))
+    end_pos: np.ndarray = pos[offsets[1:]]
+    start_pos: np.ndarray = np.append(0, end_pos[:-1])
+
+    # Holding pnl is the pnl from holding position at day start
+    holding_pnl: np.ndarray = start_pos * (close_price - pre_close) * size
+
+    # Trading pnl is the pnl from new trade during the day
+    volume_size: np.ndarray = trade_volume * size
+    trade_turnover: np.ndarray = volume_size * trade_price
+
+    trading_pnl: np.ndarray = sum_by_day(
+        trade_days,
+        pos_change * (close_price[trade_days] - trade_price) * size,
+        day_count
+    )
+    turnover: np.ndarray = sum_by_day(trade_days, trade_turnover, day_count)
+    commission: np.ndarray = sum_by_day(trade_days, trade_turnover * rate, day_count)
+    slippage_cost: np.ndarray = sum_by_day(trade_days, volume_size * slippage, day_count)
+
+    # Net pnl takes account of commission and slippage cost
+    total_pnl: np.ndarray = trading_pnl + holding_pnl
+    net_pnl: np.ndarray = total_pnl - commission - slippage_cost
+
+    daily_trades: list[list[TradeData]] = [
+        trades[offsets[i]:offsets[i + 1]] for i in range(day_count)
+    ]
+
+    data: dict = {
+        "date": dates,
+        "close_price": close_price,
+        "pre_close": pre_close,
+        "trades": daily_trades,
+        "trade_count": trade_count,
+        "start_pos": start_pos,
+        "end_pos": end_pos,
+        "turnover": turnover,
+        "commission": commission,
+        "slippage": slippage_cost,
+        "trading_pnl": trading_pnl,
+        "holding_pnl": holding_pnl,
+        "total_pnl": total_pnl,
+        "net_pnl": net_pnl
+    }
+    return data
+
+
+def sum_by_day(trade_days: np.ndarray, values: np.ndarray, day_count: int) -> np.ndarray:
+    """
+    Sum trade values of each day, keeping int type if all values are int.
+    """
+    result: np.ndarray = np.bincount(trade_days, values, minlength=day_count)
+
+    if values.dtype.kind in "iu":
+        return result.astype(values.dtype)
+    return result
+
+
 @lru_cache(maxsize=999)
 def load_bar_data(
     symbol: str,
@@ -1121,6 +2803,214 @@ def load_tick_data(
     return database.load_tick_data(symbol, exchange, start, end)       # type: ignore
 
 
+@lru_cache(maxsize=999)
+def load_resampled_bar_data(
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    start: datetime,
+    end: datetime,
+    daily_end: time | None
+) -> list[BarData]:
+    """
+    Load finer data from database and resample into bars of given interval.
+
+    Finer data is loaded from database directly instead of cached loading
+    functions, so only resampled bars are kept in cache.
+    """
+    database: BaseDatabase = get_database()
+
+    if interval != Interval.MINUTE:
+        bars: list[BarData] = database.load_bar_data(symbol, exchange, Interval.MINUTE, start, end)
+        if bars:
+            return resample_bar_data(bars, interval, daily_end)
+
+    ticks: list[TickData] = database.load_tick_data(symbol, exchange, start, end)
+    bars = resample_tick_data(ticks)
+
+    if interval == Interval.MINUTE:
+        return bars
+    return resample_bar_data(bars, interval, daily_end)
+
+
+def resample_tick_data(ticks: list[TickData]) -> list[BarData]:
+    """
+    Aggregate tick data into 1 minute bars, with same rules as BarGenerator.
+    """
+    # Filter tick data with 0 last price
+    ticks = [tick for tick in ticks if tick.last_price]
+    if not ticks:
+        return []
+
+    minutes: np.ndarray = np.array([
+        tick.datetime.toordinal() * 1440 + tick.datetime.hour * 60 + tick.datetime.minute
+        for tick in ticks
+    ])
+    price: np.ndarray = np.array([tick.last_price for tick in ticks], dtype=float)
+    volume: np.ndarray = np.array([tick.volume for tick in ticks], dtype=float)
+    turnover: np.ndarray = np.array([tick.turnover for tick in ticks], dtype=float)
+
+    # Cumulative volume and turnover of tick data is converted into change
+    volume_change: np.ndarray = np.diff(volume, prepend=volume[0]).clip(0)
+    turnover_change: np.ndarray = np.diff(turnover, prepend=turnover[0]).clip(0)
+
+    starts: np.ndarray = np.flatnonzero(np.diff(minutes, prepend=minutes[0] - 1))
+    ends: np.ndarray = np.append(starts[1:] - 1, len(ticks) - 1)
+
+    open_price: list[float] = price[starts].tolist()
+    high_price: list[float] = np.maximum.reduceat(price, starts).tolist()
+    low_price: list[float] = np.minimum.reduceat(price, starts).tolist()
+    close_price: list[float] = price[ends].tolist()
+    bar_volume: list[float] = np.add.reduceat(volume_change, starts).tolist()
+    bar_turnover: list[float] = np.add.reduceat(turnover_change, starts).tolist()
+
+    bars: list[BarData] = []
+
+    for i, (start_ix, end_ix) in enumerate(zip(starts, ends, strict=True)):
+        first_tick: TickData = ticks[start_ix]
+
+        bar: BarData = BarData(
+            symbol=first_tick.symbol,
+            exchange=first_tick.exchange,
+            datetime=first_tick.datetime.replace(second=0, microsecond=0),
+            interval=Interval.MINUTE,
+            open_price=open_price[i],
+            high_price=high_price[i],
+            low_price=low_price[i],
+            close_price=close_price[i],
+            volume=bar_volume[i],
+            turnover=bar_turnover[i],
+            open_interest=ticks[end_ix].open_interest,
+            gateway_name=first_tick.gateway_name
+        )
+        bars.append(bar)
+
+    return bars
+
+
+def resample_bar_data(
+    bars: list[BarData],
+    interval: Interval,
+    daily_end: time | None = None
+) -> list[BarData]:
+    """
+    Aggregate 1 minute bars into hour or daily bars, with same rules as
+    BarGenerator.
+
+    Daily bars are finished by the bar at daily_end (the time of the last
+    bar in a trading day), so night session is merged into the next trading
+    day. Calendar date is used if daily_end not given.
+    """
+    if not bars:
+        return []
+
+    dts: list[datetime] = [bar.datetime for bar in bars]
+
+    if interval == Interval.HOUR:
+        keys: np.ndarray = np.array([dt.toordinal() * 24 + dt.hour for dt in dts])
+        starts: np.ndarray = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+        ends: np.ndarray = np.append(starts[1:] - 1, len(bars) - 1)
+    elif interval == Interval.DAILY:
+        if daily_end:
+            # Day finishes with the bar at daily end time
+            finished: np.ndarray = np.array([dt.time() == daily_end for dt in dts])
+        else:
+            days: np.ndarray = np.array([dt.toordinal() for dt in dts])
+            finished = np.append(days[1:] != days[:-1], True)
+
+        ends = np.flatnonzero(finished)
+        starts = np.insert(ends[:-1] + 1, 0, 0)
+
+        # Keep unfinished bars after last finished day as partial group
+        if not len(ends):
+            starts = np.array([0])
+            ends = np.array([len(bars) - 1])
+        elif ends[-1] != len(bars) - 1:
+            starts = np.append(starts, ends[-1] + 1)
+            ends = np.append(ends, len(bars) - 1)
+    else:
+        return bars
+
+    high_array: np.ndarray = np.array([bar.high_price for bar in bars], dtype=float)
+    low_array: np.ndarray = np.array([bar.low_price for bar in bars], dtype=float)
+    volume_array: np.ndarray = np.array([bar.volume for bar in bars], dtype=float)
+    turnover_array: np.ndarray = np.array([bar.turnover for bar in bars], dtype=float)
+
+    high_price: list[float] = np.maximum.reduceat(high_array, starts).tolist()
+    low_price: list[float] = np.minimum.reduceat(low_array, starts).tolist()
+    volume: list[float] = np.add.reduceat(volume_array, starts).tolist()
+    turnover: list[float] = np.add.reduceat(turnover_array, starts).tolist()
+
+    results: list[BarData] = []
+
+    for i, (start_ix, end_ix) in enumerate(zip(starts, ends, strict=True)):
+        first_bar: BarData = bars[start_ix]
+        last_bar: BarData = bars[end_ix]
+
+        if interval == Interval.HOUR:
+            dt: datetime = first_bar.datetime.replace(minute=0, second=0, microsecond=0)
+        else:
+            dt = last_bar.datetime.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        bar: BarData = BarData(
+            symbol=first_bar.symbol,
+            exchange=first_bar.exchange,
+            datetime=dt,
+            interval=interval,
+            open_price=first_bar.open_price,
+            high_price=high_price[i],
+            low_price=low_price[i],
+            close_price=last_bar.close_price,
+            volume=volume[i],
+            turnover=turnover[i],
+            open_interest=last_bar.open_interest,
+            gateway_name=first_bar.gateway_name
+        )
+        results.append(bar)
+
+    return results
+
+
+def get_worker_engine(
+    vt_symbol: str,
+    interval: Interval,
+    start: datetime,
+    end: datetime,
+    mode: BacktestingMode,
+    daily_end: time | None
+) -> BacktestingEngine:
+    """
+    Return engine with history data loaded, which is reused by all settings
+    run in the same optimization worker process.
+    """
+    key: tuple = (vt_symbol, interval, start, end, mode, daily_end)
+
+    engine: BacktestingEngine | None = worker_engines.get(key, None)
+    if not engine:
+        # Only keep engine of latest history data
+        worker_engines.clear()
+        window_engines.clear()
+
+        engine = BacktestingEngine()
+        engine.set_parameters(
+            vt_symbol=vt_symbol,
+            interval=interval,
+            start=start,
+            rate=0,
+            slippage=0,
+            size=1,
+            pricetick=0,
+            end=end,
+            mode=mode,
+            daily_end=daily_end
+        )
+        engine.load_data()
+
+        worker_engines[key] = engine
+
+    return engine
+
+
 def evaluate(
     target_name: str,
     strategy_class: type[CtaTemplate],
@@ -1134,12 +3024,15 @@ def evaluate(
     capital: int,
     end: datetime,
     mode: BacktestingMode,
+    daily_end: time | None,
+    use_cache: bool,
     setting: dict
 ) -> tuple:
     """
     Function for running in multiprocessing.pool
     """
-    engine: BacktestingEngine = BacktestingEngine()
+    engine: BacktestingEngine = get_worker_engine(vt_symbol, interval, start, end, mode, daily_end)
+    engine.clear_data()
 
     engine.set_parameters(
         vt_symbol=vt_symbol,
@@ -1151,25 +3044,215 @@ def evaluate(
         pricetick=pricetick,
         capital=capital,
         end=end,
-        mode=mode
+        mode=mode,
+        daily_end=daily_end,
+        use_cache=use_cache
     )
 
+    engine.set_log_buffer(enabled=False)
     engine.add_strategy(strategy_class, setting)
-    engine.load_data()
     engine.run_backtesting()
-    engine.calculate_result()
-    statistics: dict = engine.calculate_statistics(output=False)
+    statistics: dict = engine.calculate_fast_statistics()
 
     target_value: float = statistics.get(target_name, 0)
     return (setting, target_value, statistics)
 
 
-def wrap_evaluate(engine: BacktestingEngine, target_name: str) -> Callable:
+def wrap_init_worker(engine: BacktestingEngine) -> Callable:
     """
-    Wrap evaluate function with given setting from backtesting engine.
+    Wrap function for loading history data when optimization worker started.
     """
     func: Callable = partial(
-        evaluate,
+        get_worker_engine,
+        engine.vt_symbol,
+        engine.interval,
+        engine.start,
+        engine.end,
+        engine.mode,
+        engine.daily_end
+    )
+    return func
+
+
+def run_bootstrap_chunk(func: Callable, count: int, seed: np.random.SeedSequence) -> dict:
+    """
+    Function for running bootstrap chunk in process pool.
+    """
+    result: dict = func(sample_count=count, seed=seed)
+    return result
+
+
+def run_forked_scenario(
+    engine: BacktestingEngine,
+    setting: dict,
+    start_ix: int,
+    conn: Connection
+) -> None:
+    """
+    Function for running scenario in forked process.
+    """
+    result: tuple[dict, dict] = engine.run_scenario(setting, start_ix)
+    conn.send(result)
+    conn.close()
+
+
+def evaluate_stage(
+    target_name: str,
+    strategy_class: type[CtaTemplate],
+    vt_symbol: str,
+    interval: Interval,
+    start: datetime,
+    rate: float,
+    slippage: float,
+    size: float,
+    pricetick: float,
+    capital: int,
+    end: datetime,
+    mode: BacktestingMode,
+    daily_end: time | None,
+    use_cache: bool,
+    task: tuple
+) -> tuple:
+    """
+    Function for running one stage of successive halving in process pool.
+
+    Backtesting continues from checkpoint file of last stage if provided,
+    and engine state is saved into new checkpoint file in folder, so only
+    file path is returned to main process.
+    """
+    setting, start_fraction, end_fraction, checkpoint, folder = task
+
+    worker_engine: BacktestingEngine = get_worker_engine(vt_symbol, interval, start, end, mode, daily_end)
+    history_data: list = worker_engine.history_data
+
+    if checkpoint:
+        checkpoint_path: Path = Path(checkpoint)
+        with open(checkpoint_path, "rb") as f:
+            engine: BacktestingEngine = pickle.load(f)
+        checkpoint_path.unlink()
+
+        engine.history_data = history_data
+        engine.history_arrays = worker_engine.history_arrays
+    else:
+        engine = worker_engine
+        engine.clear_data()
+
+        engine.set_parameters(
+            vt_symbol=vt_symbol,
+            interval=interval,
+            start=start,
+            rate=rate,
+            slippage=slippage,
+            size=size,
+            pricetick=pricetick,
+            capital=capital,
+            end=end,
+            mode=mode,
+            daily_end=daily_end
+        )
+
+        engine.set_log_buffer(enabled=False)
+        engine.add_strategy(strategy_class, setting)
+        engine.start_backtesting()
+
+        # Restart from beginning if no checkpoint saved
+        start_fraction = 0
+
+    count: int = len(history_data)
+    start_ix: int = int(count * start_fraction)
+    end_ix: int = int(count * end_fraction)
+
+    finished: bool = end_fraction >= 1
+    if engine.replay_data(history_data[start_ix:end_ix], False) and finished:
+        engine.stop_backtesting()
+
+    statistics: dict = engine.calculate_fast_statistics()
+    target_value: float = statistics.get(target_name, 0)
+
+    if finished:
+        return (setting, target_value, statistics, "")
+
+    path: Path = Path(folder).joinpath(f"{uuid4().hex}.pkl")
+    if not engine.save_checkpoint(path):
+        return (setting, target_value, statistics, "")
+    return (setting, target_value, statistics, str(path))
+
+
+def evaluate_window(
+    target_name: str,
+    strategy_class: type[CtaTemplate],
+    vt_symbol: str,
+    interval: Interval,
+    start: datetime,
+    rate: float,
+    slippage: float,
+    size: float,
+    pricetick: float,
+    capital: int,
+    end: datetime,
+    mode: BacktestingMode,
+    daily_end: time | None,
+    use_cache: bool,
+    task: tuple
+) -> tuple:
+    """
+    Function for running walk forward window in process pool.
+    Daily result is also returned for out of sample window.
+    """
+    setting, window, out_of_sample = task
+    start_ix, end_ix, window_start, window_end = window
+
+    worker_engine: BacktestingEngine = get_worker_engine(vt_symbol, interval, start, end, mode, daily_end)
+
+    # Window engine shares history data loaded by worker engine
+    key: tuple = (start_ix, end_ix)
+    engine: BacktestingEngine | None = window_engines.get(key, None)
+    if not engine:
+        engine = BacktestingEngine()
+        engine.history_data = worker_engine.history_data[start_ix:end_ix]
+        window_engines[key] = engine
+
+    engine.clear_data()
+
+    engine.set_parameters(
+        vt_symbol=vt_symbol,
+        interval=interval,
+        start=window_start,
+        rate=rate,
+        slippage=slippage,
+        size=size,
+        pricetick=pricetick,
+        capital=capital,
+        end=window_end,
+        mode=mode,
+        daily_end=daily_end,
+        use_cache=use_cache
+    )
+
+    engine.set_log_buffer(enabled=False)
+    engine.add_strategy(strategy_class, setting)
+    engine.run_backtesting()
+
+    statistics: dict = engine.calculate_fast_statistics()
+    target_value: float = statistics.get(target_name, 0)
+
+    daily_df: DataFrame | None = None
+    if out_of_sample:
+        daily_df = engine.calculate_result()
+
+    return (setting, target_value, statistics, daily_df)
+
+
+def wrap_evaluate(
+    engine: BacktestingEngine,
+    target_name: str,
+    func: Callable = evaluate
+) -> Callable:
+    """
+    Wrap evaluate function with given setting from backtesting engine.
+    """
+    func = partial(
+        func,
         target_name,
         engine.strategy_class,
         engine.vt_symbol,
@@ -1181,12 +3264,14 @@ def wrap_evaluate(engine: BacktestingEngine, target_name: str) -> Callable:
         engine.pricetick,
         engine.capital,
         engine.end,
-        engine.mode
+        engine.mode,
+        engine.daily_end,
+        engine.use_cache
     )
     return func
 
 
-def get_target_value(result: list) -> float:
+def get_target_value(result: tuple) -> float:
     """
     Get target value for sorting optimization results.
     """
@@ -542,6 +542,12 @@ class CtaEngine(BaseEngine):
         else:
             return None
 
+    def get_indicator(self, strategy: CtaTemplate, bar: BarData, name: str, *args: Any) -> None:
+        """
+        Indicator cache is only available in backtesting.
+        """
+        return None
+
     def load_bar(
         self,
         vt_symbol: str,
@@ -0,0 +1,1354 @@
+"""
+Optimization runners for CTA strategy backtesting.
+
+Compared with the runners in vnpy.trader.optimize, worker processes are
+initialized once before running settings, settings are dispatched to
+workers in chunks, and results can be saved into a local store for
+resuming interrupted optimization.
+
+Settings can also be evaluated by workers on other hosts, which pull tasks
+from a queue server started with QueueExecutor.
+
+Bayesian optimization fits a Gaussian process surrogate model of target
+value with NumPy, so only a small part of settings need to be evaluated.
+
+Settings are generated lazily from parameter ranges, with invalid ones
+skipped by constraint functions before sent to workers.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from functools import partial
+from itertools import chain, islice, product
+from multiprocessing import get_context
+from multiprocessing.managers import BaseManager
+from os import cpu_count
+from pathlib import Path
+from queue import Empty, Queue
+from random import choice, random
+from tempfile import TemporaryDirectory
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
+from typing import Any
+import heapq
+import json
+import math
+import pickle
+import secrets
+import sqlite3
+import traceback
+
+import numpy as np
+from tqdm import tqdm
+from deap import algorithms, base, creator, tools
+
+from vnpy.trader.optimize import OptimizationSetting
+from vnpy.trader.utility import get_folder_path
+
+from .locale import _
+from .statistics import STATISTICS_KEYS
+
+
+OUTPUT_FUNC = Callable[[str], None]
+EVALUATE_FUNC = Callable[[dict], tuple]
+KEY_FUNC = Callable[[tuple], float]
+CONSTRAINT_FUNC = Callable[[dict], bool]
+
+STORE_FOLDER: str = "cta_optimization"
+
+# Max number of settings sent to worker at once
+MAX_CHUNK_SIZE: int = 100
+
+# Length scales of kernel tried when fitting Gaussian process
+LENGTH_SCALES: tuple[float, ...] = (0.05, 0.1, 0.2, 0.4, 0.8)
+
+# Default limit of settings evaluated in Bayesian optimization, for model
+# fitting cost grows with cube of the number of results
+MAX_BAYES_COUNT: int = 300
+
+# Max number of unevaluated points scored when proposing settings
+MAX_CANDIDATE_COUNT: int = 10_000
+
+task_queue: Queue = Queue()
+result_queue: Queue = Queue()
+
+
+class OptimizationStore:
+    """
+    SQLite store of optimization results.
+
+    Results are saved with study key identifying strategy, history data and
+    engine parameters, so settings already evaluated in same study can be
+    skipped in later runs.
+    """
+
+    def __init__(self, path: Path | str | None = None, commit_count: int = 100) -> None:
+        """"""
+        if path is None:
+            path = get_folder_path(STORE_FOLDER).joinpath("optimization.db")
+
+        self.commit_count: int = commit_count
+        self.uncommitted: int = 0
+
+        self.connection: sqlite3.Connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS result ("
+            "study TEXT, setting TEXT, statistics BLOB, "
+            "PRIMARY KEY (study, setting))"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def get_setting_key(setting: dict) -> str:
+        """
+        Return text identifying setting, regardless of key order.
+        """
+        return json.dumps(setting, sort_keys=True, default=str)
+
+    def load_results(self, study: str) -> dict[str, dict]:
+        """
+        Return statistics of all settings saved in study.
+        """
+        cursor: sqlite3.Cursor = self.connection.execute(
+            "SELECT setting, statistics FROM result WHERE study = ?",
+            (study,)
+        )
+        return {setting: pickle.loads(data) for setting, data in cursor}
+
+    def save_result(self, study: str, setting: dict, statistics: dict) -> None:
+        """
+        Save statistics of setting, committed once every commit count results.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO result VALUES (?, ?, ?)",
+            (study, self.get_setting_key(setting), pickle.dumps(statistics))
+        )
+
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_count:
+            self.commit()
+
+    def commit(self) -> None:
+        """"""
+        self.connection.commit()
+        self.uncommitted = 0
+
+    def close(self) -> None:
+        """"""
+        self.commit()
+        self.connection.close()
+
+
+def get_task_queue() -> Queue:
+    """"""
+    return task_queue
+
+
+def get_result_queue() -> Queue:
+    """"""
+    return result_queue
+
+
+class QueueManager(BaseManager):
+    """
+    Manager serving task and result queues to optimization workers.
+    """
+    pass
+
+
+QueueManager.register("get_task_queue", callable=get_task_queue)
+QueueManager.register("get_result_queue", callable=get_result_queue)
+
+
+class QueueBatch:
+    """
+    Batch of tasks sent to workers, with future of its results.
+    """
+
+    def __init__(self, data: bytes, single: bool) -> None:
+        """"""
+        self.data: bytes = data
+        self.single: bool = single
+        self.future: Future = Future()
+
+        # Time when taken by worker, 0 if waiting in queue
+        self.start: float = 0
+        self.retry_count: int = 0
+
+
+class QueueExecutor(Executor):
+    """
+    Executor sending tasks to workers through queue server.
+
+    Queue server is started at address when created, and workers started
+    with run_queue_workers on any host can connect to it with the same
+    authkey. Tasks are sent in batches, and results are yielded in order.
+    Workers need the same strategy code and database as this host.
+
+    If timeout given, batch not finished in timeout seconds after taken by
+    worker is sent again for worker lost, up to retry_count times, and then
+    its future fails with TimeoutError.
+
+    Tasks are pickled, so anyone connected with the authkey can run any
+    code on workers, and any worker can send any result back. Server only
+    listens on localhost by default. Only bind it to other interfaces in
+    trusted network, and keep authkey secret. A random authkey is generated
+    if not given, which can be read from authkey attribute.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 50000),
+        authkey: bytes | None = None,
+        batch_size: int = 0,
+        timeout: float = 0,
+        retry_count: int = 1
+    ) -> None:
+        """"""
+        self.authkey: bytes = authkey or secrets.token_bytes(32)
+        self.batch_size: int = batch_size
+        self.batch_count: int = 0
+        self.timeout: float = timeout
+        self.retry_count: int = retry_count
+
+        self.batches: dict[int, QueueBatch] = {}
+        self.lock: Lock = Lock()
+
+        self.manager: QueueManager = QueueManager(address, self.authkey)
+        self.manager.start()
+
+        # Real address if port 0 given
+        self.address: tuple[str, int] = self.manager.address             # type: ignore
+
+        self.task_queue: Any = self.manager.get_task_queue()            # type: ignore
+        self.result_queue: Any = self.manager.get_result_queue()        # type: ignore
+
+        self.thread: Thread = Thread(target=self.receive_results, daemon=True)
+        self.thread.start()
+
+    def send_batch(self, fn: Callable, args: list[tuple], single: bool) -> Future:
+        """
+        Send batch of tasks to workers, and return future of batch results.
+
+        Function is pickled with batch here, so the server process does not
+        need to import strategy code.
+        """
+        batch: QueueBatch = QueueBatch(pickle.dumps((fn, args)), single)
+
+        with self.lock:
+            batch_id: int = self.batch_count
+            self.batch_count += 1
+            self.batches[batch_id] = batch
+
+        self.task_queue.put((batch_id, batch.data))
+        return batch.future
+
+    def receive_results(self) -> None:
+        """
+        Set results received from workers into futures, until None received
+        when shut down.
+
+        Workers send None results when batch taken, which starts timeout of
+        the batch.
+        """
+        while True:
+            if self.timeout:
+                self.check_timeout()
+
+            try:
+                if self.timeout:
+                    data: tuple | None = self.result_queue.get(timeout=min(self.timeout, 1))
+                else:
+                    data = self.result_queue.get()
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            if data is None:
+                return
+            batch_id, results, error = data
+
+            with self.lock:
+                batch: QueueBatch | None = self.batches.get(batch_id, None)
+
+                # Batch sent again may be finished already
+                if batch is None:
+                    continue
+
+                # Timeout starts when batch taken by worker
+                if results is None:
+                    batch.start = perf_counter()
+                    continue
+
+                self.batches.pop(batch_id)
+
+            if error:
+                batch.future.set_exception(RuntimeError(error))
+            elif batch.single:
+                batch.future.set_result(results[0])
+            else:
+                batch.future.set_result(results)
+
+    def check_timeout(self) -> None:
+        """
+        Send batches timed out again, or fail their futures if retried
+        enough times.
+        """
+        now: float = perf_counter()
+        resent: list[tuple[int, bytes]] = []
+        failed: list[tuple[int, QueueBatch]] = []
+
+        with self.lock:
+            for batch_id, batch in list(self.batches.items()):
+                if not batch.start or now - batch.start < self.timeout:
+                    continue
+
+                if batch.retry_count < self.retry_count:
+                    batch.start = 0
+                    batch.retry_count += 1
+                    resent.append((batch_id, batch.data))
+                else:
+                    self.batches.pop(batch_id)
+                    failed.append((batch_id, batch))
+
+        for batch_id, data in resent:
+            self.task_queue.put((batch_id, data))
+
+        for batch_id, batch in failed:
+            batch.future.set_exception(TimeoutError(_("任务批次{}超时未完成").format(batch_id)))
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        """
+        Send one task to workers, and return future of its result.
+        """
+        if kwargs:
+            fn = partial(fn, **kwargs)
+
+        return self.send_batch(fn, [args], True)
+
+    def map(
+        self,
+        fn: Callable,
+        *iterables: Iterable,
+        timeout: float | None = None,
+        chunksize: int = 1
+    ) -> Iterator:
+        """
+        Send tasks to workers in batches, and yield results in order.
+        """
+        args: list[tuple] = list(zip(*iterables, strict=False))
+        batch_size: int = self.batch_size or chunksize
+
+        futures: list[Future] = [
+            self.send_batch(fn, args[i:i + batch_size], False)
+            for i in range(0, len(args), batch_size)
+        ]
+
+        return self.get_results(futures, timeout)
+
+    def get_results(self, futures: list[Future], timeout: float | None) -> Iterator:
+        """
+        Yield results of batches in order.
+        """
+        end: float | None = None
+        if timeout is not None:
+            end = timeout + perf_counter()
+
+        for future in futures:
+            if end is None:
+                results: list = future.result()
+            else:
+                results = future.result(end - perf_counter())
+
+            yield from results
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """
+        Stop queue server, which also stops connected workers. Futures not
+        finished are cancelled.
+        """
+        self.result_queue.put(None)
+        self.thread.join()
+
+        self.manager.shutdown()
+
+        with self.lock:
+            for batch in self.batches.values():
+                batch.future.cancel()
+            self.batches.clear()
+
+
+def run_queue_worker(address: tuple[str, int], authkey: bytes, timeout: float = 60) -> None:
+    """
+    Connect to queue server and run tasks until server stopped.
+    """
+    manager: QueueManager = QueueManager(address, authkey)
+
+    # Wait for queue server to be started
+    start: float = perf_counter()
+    while True:
+        try:
+            manager.connect()
+            break
+        except ConnectionRefusedError:
+            if perf_counter() - start > timeout:
+                return
+            sleep(1)
+
+    task_queue: Any = manager.get_task_queue()                          # type: ignore
+    result_queue: Any = manager.get_result_queue()                      # type: ignore
+
+    while True:
+        try:
+            batch_id, data = task_queue.get()
+            result_queue.put((batch_id, None, ""))
+        except (EOFError, OSError):
+            return
+
+        try:
+            fn, args = pickle.loads(data)
+            results: list = [fn(*arg) for arg in args]
+            result_queue.put((batch_id, results, ""))
+        except Exception:
+            result_queue.put((batch_id, [], traceback.format_exc()))
+
+
+def run_queue_workers(
+    address: tuple[str, int],
+    authkey: bytes,
+    process_count: int | None = None,
+    timeout: float = 60
+) -> None:
+    """
+    Start worker processes on this host, and wait until all stopped.
+    """
+    context = get_context("spawn")
+
+    processes: list = []
+    for _i in range(process_count or cpu_count() or 1):
+        process = context.Process(target=run_queue_worker, args=(address, authkey, timeout))
+        process.start()
+        processes.append(process)
+
+    for process in processes:
+        process.join()
+
+
+def push_top_result(heap: list[tuple[float, int, tuple]], item: tuple[float, int, tuple], count: int) -> None:
+    """
+    Push (target value, order, result) into min heap keeping best count items.
+    """
+    if len(heap) < count:
+        heapq.heappush(heap, item)
+    elif item[0] > heap[0][0]:
+        heapq.heapreplace(heap, item)
+
+
+class OptimizationTable:
+    """
+    Optimization results stored in NumPy structured array, with one field
+    for each parameter, target value and each statistic.
+
+    Statistics dict of result is dropped after added into table, except for
+    the best top_count results, so memory used is much less than keeping
+    all results in list. Rows can be filtered with array operations on data.
+    """
+
+    def __init__(
+        self,
+        optimization_setting: OptimizationSetting,
+        key_func: KEY_FUNC,
+        top_count: int = 0,
+        capacity: int = 1024
+    ) -> None:
+        """"""
+        self.key_func: KEY_FUNC = key_func
+        self.top_count: int = top_count
+        self.top_heap: list[tuple[float, int, tuple]] = []
+
+        self.param_names: list[str] = list(optimization_setting.params.keys())
+        self.statistic_names: list[str] = [
+            key for key in STATISTICS_KEYS if key not in {"start_date", "end_date"}
+        ]
+
+        fields: list[tuple[str, Any]] = []
+        for name, values in optimization_setting.params.items():
+            dtype: np.dtype = np.asarray(values).dtype
+            if dtype.kind not in "biuf":
+                dtype = np.dtype(object)
+            fields.append((name, dtype))
+
+        fields.append(("target", float))
+        fields.extend((name, float) for name in self.statistic_names)
+
+        self.dtype: np.dtype = np.dtype(fields)
+        self.array: np.ndarray = np.zeros(capacity, dtype=self.dtype)
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        """"""
+        return self.count
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        Return structured array of all results added.
+        """
+        return self.array[:self.count]
+
+    @property
+    def top_results(self) -> list[tuple]:
+        """
+        Return best results with statistics dict, sorted by target value.
+        """
+        return [item[2] for item in sorted(self.top_heap, reverse=True)]
+
+    def append(self, result: tuple) -> None:
+        """
+        Add (setting, target value, statistics) result into table.
+        """
+        if self.count == len(self.array):
+            self.array = np.resize(self.array, len(self.array) * 2)
+
+        setting, target_value, statistics = result[:3]
+
+        row: np.void = self.array[self.count]
+        for name in self.param_names:
+            row[name] = setting[name]
+
+        row["target"] = target_value
+        for name in self.statistic_names:
+            row[name] = statistics.get(name, np.nan)
+
+        self.count += 1
+
+        if self.top_count:
+            push_top_result(self.top_heap, (self.key_func(result), self.count, result), self.top_count)
+
+    def get_settings(self, rows: np.ndarray) -> list[dict]:
+        """
+        Return settings of rows selected from data.
+        """
+        settings: list[dict] = []
+
+        for row in rows:
+            setting: dict = {}
+            for name in self.param_names:
+                value: Any = row[name]
+                if isinstance(value, np.generic):
+                    value = value.item()
+                setting[name] = value
+            settings.append(setting)
+
+        return settings
+
+
+def generate_settings(
+    optimization_setting: OptimizationSetting,
+    constraints: list[CONSTRAINT_FUNC] | None = None
+) -> Iterator[dict]:
+    """
+    Generate settings lazily from parameter ranges, and skip settings
+    failing any of constraint functions.
+    """
+    names: list[str] = list(optimization_setting.params.keys())
+
+    for values in product(*optimization_setting.params.values()):
+        setting: dict = dict(zip(names, values, strict=True))
+
+        if constraints and not all(func(setting) for func in constraints):
+            continue
+
+        yield setting
+
+
+def get_setting_count(optimization_setting: OptimizationSetting) -> int:
+    """
+    Return number of settings before checked by constraint functions.
+    """
+    return math.prod(len(values) for values in optimization_setting.params.values())
+
+
+def check_optimization_setting(
+    optimization_setting: OptimizationSetting,
+    output: OUTPUT_FUNC = print
+) -> bool:
+    """
+    Return whether the setting has combinations and a target name, without
+    generating all settings like the check function in vnpy.
+    """
+    if not get_setting_count(optimization_setting):
+        output(_("优化参数组合为空，请检查"))
+        return False
+
+    if not optimization_setting.target_name:
+        output(_("优化目标未设置，请检查"))
+        return False
+
+    return True
+
+
+def get_chunk_size(task_count: int, max_workers: int | None) -> int:
+    """
+    Return number of settings sent to worker at once, so each worker gets
+    about 4 chunks for balancing load.
+    """
+    worker_count: int = max_workers or cpu_count() or 1
+    return max(min(task_count // (worker_count * 4), MAX_CHUNK_SIZE), 1)
+
+
+def map_settings(
+    executor: Executor,
+    evaluate_func: EVALUATE_FUNC,
+    settings: Iterator[dict],
+    chunk_size: int,
+    window_size: int
+) -> Iterator[tuple]:
+    """
+    Run settings with executor in windows of chunks, so only settings in
+    two windows are generated before their results are received.
+
+    Next window is sent before waiting for results of current one, so
+    workers are kept busy.
+    """
+    chunks: Iterator[list[dict]] = iter(lambda: list(islice(settings, chunk_size)), [])
+    func: Callable = partial(evaluate_chunk, evaluate_func)
+
+    current: Iterator[list[tuple]] = executor.map(func, list(islice(chunks, window_size)))
+
+    while True:
+        window: list[list[dict]] = list(islice(chunks, window_size))
+        following: Iterator[list[tuple]] | None = executor.map(func, window) if window else None
+
+        for results in current:
+            yield from results
+
+        if following is None:
+            return
+        current = following
+
+
+def run_bf_optimization(
+    evaluate_func: EVALUATE_FUNC,
+    optimization_setting: OptimizationSetting,
+    key_func: KEY_FUNC,
+    max_workers: int | None = None,
+    output: OUTPUT_FUNC = print,
+    initializer: Callable | None = None,
+    chunk_size: int = 0,
+    store: OptimizationStore | None = None,
+    study: str = "",
+    executor: Executor | None = None,
+    table: OptimizationTable | None = None,
+    constraints: list[CONSTRAINT_FUNC] | None = None
+) -> list[tuple]:
+    """
+    Run brutal force optimization with workers initialized by initializer.
+
+    Settings are generated lazily while sent to workers, and settings
+    failing any of constraints are skipped.
+
+    If store given, settings with result saved in the study are skipped,
+    and new results are saved when finished. If executor given, settings
+    are run by it instead of local process pool, and it is shut down when
+    finished. If table given, results are added into table instead of
+    list, and only top results of table are returned.
+    """
+    total_count: int = get_setting_count(optimization_setting)
+
+    output(_("开始执行穷举算法优化"))
+    output(_("参数优化空间：{}").format(total_count))
+
+    results: list[tuple] = []
+    add_result: Callable[[tuple], None] = table.append if table is not None else results.append
+
+    settings: Iterator[dict] = generate_settings(optimization_setting, constraints)
+
+    if store:
+        saved: dict[str, dict] = store.load_results(study)
+        target_name: str = optimization_setting.target_name
+
+        def get_pending(settings: Iterator[dict]) -> Iterator[dict]:
+            """
+            Yield settings without result saved, and add saved results.
+            """
+            for setting in settings:
+                statistics: dict | None = saved.get(OptimizationStore.get_setting_key(setting), None)
+
+                if statistics is None:
+                    yield setting
+                else:
+                    add_result((setting, statistics.get(target_name, 0), statistics))
+
+        settings = get_pending(settings)
+
+    if not chunk_size:
+        chunk_size = get_chunk_size(total_count, max_workers)
+
+    start: float = perf_counter()
+    run_count: int = 0
+
+    # No need to start workers if no setting to run
+    first: dict | None = next(settings, None)
+
+    if first is not None:
+        if not executor:
+            executor = ProcessPoolExecutor(
+                max_workers,
+                mp_context=get_context("spawn"),
+                initializer=initializer
+            )
+
+        worker_count: int = max_workers or cpu_count() or 1
+
+        with executor:
+            it: Iterable = tqdm(
+                map_settings(
+                    executor,
+                    evaluate_func,
+                    chain([first], settings),
+                    chunk_size,
+                    worker_count * 4
+                ),
+                total=total_count
+            )
+
+            try:
+                for result in it:
+                    add_result(result)
+                    run_count += 1
+
+                    if store:
+                        store.save_result(study, result[0], result[2])
+            finally:
+                if store:
+                    store.commit()
+
+    result_count: int = len(table) if table is not None else len(results)
+
+    if table is not None:
+        results = table.top_results
+    else:
+        results.sort(reverse=True, key=key_func)
+
+    if store:
+        output(_("已保存结果数量：{}，待运行数量：{}").format(result_count - run_count, run_count))
+
+    if result_count < total_count:
+        output(_("不满足参数约束的数量：{}").format(total_count - result_count))
+
+    end: float = perf_counter()
+    cost: int = int(end - start)
+    output(_("穷举算法优化完成，耗时{}秒").format(cost))
+
+    return results
+
+
+def evaluate_chunk(evaluate_func: EVALUATE_FUNC, settings: list[dict]) -> list[tuple]:
+    """
+    Function for running chunk of settings in process pool.
+    """
+    return [evaluate_func(setting) for setting in settings]
+
+
+class OptimizationStream:
+    """
+    Iterator of brute force optimization results, yielded as soon as each
+    chunk of settings is finished.
+
+    Best results are kept in top_results while iterating. Calling cancel,
+    even from another thread, or breaking out of the loop stops sending
+    settings to workers and shuts down the process pool.
+    """
+
+    def __init__(
+        self,
+        evaluate_func: EVALUATE_FUNC,
+        optimization_setting: OptimizationSetting,
+        key_func: KEY_FUNC,
+        max_workers: int | None = None,
+        output: OUTPUT_FUNC = print,
+        initializer: Callable | None = None,
+        top_count: int = 10,
+        constraints: list[CONSTRAINT_FUNC] | None = None
+    ) -> None:
+        """"""
+        self.evaluate_func: EVALUATE_FUNC = evaluate_func
+        self.optimization_setting: OptimizationSetting = optimization_setting
+        self.constraints: list[CONSTRAINT_FUNC] | None = constraints
+        self.key_func: KEY_FUNC = key_func
+        self.max_workers: int = max_workers or cpu_count() or 1
+        self.output: OUTPUT_FUNC = output
+        self.initializer: Callable | None = initializer
+        self.top_count: int = top_count
+
+        self.finished_count: int = 0
+        self.top_heap: list[tuple[float, int, tuple]] = []
+        self.cancel_event: Event = Event()
+
+    @property
+    def total_count(self) -> int:
+        """
+        Return number of settings before checked by constraints.
+        """
+        return get_setting_count(self.optimization_setting)
+
+    @property
+    def top_results(self) -> list[tuple]:
+        """
+        Return best results finished so far, sorted by target value.
+        """
+        return [item[2] for item in sorted(self.top_heap, reverse=True)]
+
+    def cancel(self) -> None:
+        """
+        Stop running optimization after chunks being run are finished.
+        """
+        self.cancel_event.set()
+
+    def __iter__(self) -> Iterator[tuple]:
+        """
+        Yield (setting, target value, statistics) of finished settings.
+        """
+        self.output(_("开始执行穷举算法优化"))
+        self.output(_("参数优化空间：{}").format(self.total_count))
+
+        settings: Iterator[dict] = generate_settings(self.optimization_setting, self.constraints)
+
+        chunk_size: int = get_chunk_size(self.total_count, self.max_workers)
+        chunks: Iterator[list[dict]] = iter(lambda: list(islice(settings, chunk_size)), [])
+
+        executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            self.max_workers,
+            mp_context=get_context("spawn"),
+            initializer=self.initializer
+        )
+
+        # Only keep two chunks for each worker in pool, so no more settings
+        # are sent after cancelled
+        pending: set[Future] = set()
+
+        try:
+            while not self.cancel_event.is_set():
+                while len(pending) < self.max_workers * 2:
+                    chunk: list[dict] | None = next(chunks, None)
+                    if not chunk:
+                        break
+                    pending.add(executor.submit(evaluate_chunk, self.evaluate_func, chunk))
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    for result in future.result():
+                        self.finished_count += 1
+                        push_top_result(
+                            self.top_heap,
+                            (self.key_func(result), self.finished_count, result),
+                            self.top_count
+                        )
+                        yield result
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+            if self.cancel_event.is_set() or pending:
+                self.output(_("穷举算法优化已停止，完成数量：{}").format(self.finished_count))
+            else:
+                self.output(_("穷举算法优化完成，完成数量：{}").format(self.finished_count))
+
+
+def run_halving_optimization(
+    evaluate_func: Callable[[tuple], tuple],
+    optimization_setting: OptimizationSetting,
+    key_func: KEY_FUNC,
+    max_workers: int | None = None,
+    output: OUTPUT_FUNC = print,
+    initializer: Callable | None = None,
+    eta: int = 3,
+    min_fraction: float = 0.1,
+    constraints: list[CONSTRAINT_FUNC] | None = None
+) -> list[tuple]:
+    """
+    Run successive halving optimization.
+
+    All settings are run on a short prefix of history data first, then
+    only top 1/eta of them continue to run on a period eta times longer,
+    until the end of history data.
+
+    Evaluate function receives (setting, start fraction, end fraction,
+    checkpoint, folder) task, and returns (setting, target value,
+    statistics, checkpoint) result. Checkpoint is path of file saved into
+    the temporary folder, used for continuing the run in next stage, so
+    engine states are not kept in memory of main process. Checkpoint files
+    of dropped settings are deleted after each stage.
+    """
+    settings: list[dict] = list(generate_settings(optimization_setting, constraints))
+
+    # Fraction of history data at the end of each stage
+    fractions: list[float] = []
+    fraction: float = 1
+    while fraction > min_fraction:
+        fractions.insert(0, fraction)
+        fraction /= eta
+
+    output(_("开始执行逐次减半优化"))
+    output(_("参数优化空间：{}").format(len(settings)))
+
+    start: float = perf_counter()
+
+    candidates: list[tuple[dict, str]] = [(setting, "") for setting in settings]
+    start_fraction: float = 0
+    results: list[tuple] = []
+
+    with TemporaryDirectory() as folder, ProcessPoolExecutor(
+        max_workers,
+        mp_context=get_context("spawn"),
+        initializer=initializer
+    ) as executor:
+        for i, end_fraction in enumerate(fractions):
+            output(_("第{}轮优化，数据区间：{:.0%}，参数组合数量：{}").format(
+                i + 1, end_fraction, len(candidates)
+            ))
+
+            tasks: list[tuple] = [
+                (setting, start_fraction, end_fraction, checkpoint, folder)
+                for setting, checkpoint in candidates
+            ]
+
+            it: Iterable = tqdm(
+                executor.map(
+                    evaluate_func,
+                    tasks,
+                    chunksize=get_chunk_size(len(tasks), max_workers)
+                ),
+                total=len(tasks)
+            )
+            results = list(it)
+            results.sort(reverse=True, key=key_func)
+
+            # Keep top settings with checkpoint for next stage
+            keep_count: int = -(-len(results) // eta)
+            candidates = [(result[0], result[3]) for result in results[:keep_count]]
+            start_fraction = end_fraction
+
+            for result in results[keep_count:]:
+                if result[3]:
+                    Path(result[3]).unlink(missing_ok=True)
+
+    end: float = perf_counter()
+    cost: int = int(end - start)
+    output(_("逐次减半优化完成，耗时{}秒").format(cost))
+
+    return [result[:3] for result in results]
+
+
+def run_wf_optimization(
+    evaluate_func: Callable[[tuple], tuple],
+    optimization_setting: OptimizationSetting,
+    windows: list[tuple],
+    key_func: KEY_FUNC,
+    max_workers: int | None = None,
+    output: OUTPUT_FUNC = print,
+    initializer: Callable | None = None,
+    constraints: list[CONSTRAINT_FUNC] | None = None
+) -> list[tuple[tuple, tuple]]:
+    """
+    Run walk forward optimization of (in sample, out of sample) windows.
+
+    Brute force optimization of all in sample windows are run together in
+    one process pool, then best setting of each window is run on its out of
+    sample window in the same pool.
+
+    Evaluate function receives (setting, window, out of sample) task. Return
+    (best in sample result, out of sample result) of each window.
+    """
+    settings: list[dict] = list(generate_settings(optimization_setting, constraints))
+    if not settings:
+        output(_("没有满足参数约束的参数组合"))
+        return []
+
+    output(_("开始执行滚动优化"))
+    output(_("参数优化空间：{}，滚动窗口数量：{}").format(len(settings), len(windows)))
+
+    start: float = perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers,
+        mp_context=get_context("spawn"),
+        initializer=initializer
+    ) as executor:
+        tasks: list[tuple] = [
+            (setting, train_window, False)
+            for train_window, _test_window in windows
+            for setting in settings
+        ]
+
+        it: Iterable = tqdm(
+            executor.map(
+                evaluate_func,
+                tasks,
+                chunksize=get_chunk_size(len(tasks), max_workers)
+            ),
+            total=len(tasks)
+        )
+        results: list[tuple] = list(it)
+
+        # Best setting of each in sample window
+        count: int = len(settings)
+        train_results: list[tuple] = [
+            max(results[i:i + count], key=key_func)
+            for i in range(0, len(results), count)
+        ]
+
+        test_tasks: list[tuple] = [
+            (result[0], test_window, True)
+            for result, (_train_window, test_window) in zip(train_results, windows, strict=True)
+        ]
+        test_results: list[tuple] = list(executor.map(evaluate_func, test_tasks))
+
+    end: float = perf_counter()
+    cost: int = int(end - start)
+    output(_("滚动优化完成，耗时{}秒").format(cost))
+
+    return list(zip(train_results, test_results, strict=True))
+
+
+def run_ga_optimization(
+    evaluate_func: EVALUATE_FUNC,
+    optimization_setting: OptimizationSetting,
+    key_func: KEY_FUNC,
+    max_workers: int | None = None,
+    output: OUTPUT_FUNC = print,
+    initializer: Callable | None = None,
+    executor: Executor | None = None,
+    pop_size: int = 100,
+    ngen: int = 30,
+    mu: int | None = None,
+    lambda_: int | None = None,
+    cxpb: float = 0.95,
+    mutpb: float | None = None,
+    indpb: float = 1.0
+) -> list[tuple]:
+    """
+    Run genetic algorithm optimization with DEAP like the runner in vnpy.
+
+    Genes are chosen from parameter values directly, so settings are not
+    generated in advance. Results are cached in this process, and each
+    generation only sends settings not evaluated yet to executor, which is
+    local process pool by default and shut down when finished.
+    """
+    names: list[str] = list(optimization_setting.params.keys())
+    values: list[list] = list(optimization_setting.params.values())
+
+    def generate_parameter() -> list[tuple]:
+        """
+        Choose one parameter combination at random.
+        """
+        return [(name, choice(v)) for name, v in zip(names, values, strict=True)]
+
+    def mutate_individual(individual: list, indpb: float) -> tuple:
+        """
+        Replace genes at random with values from another parameter combination.
+        """
+        parameter: list[tuple] = generate_parameter()
+        for i in range(len(individual)):
+            if random() < indpb:
+                individual[i] = parameter[i]
+        return individual,
+
+    pool: Executor = executor or ProcessPoolExecutor(
+        max_workers,
+        mp_context=get_context("spawn"),
+        initializer=initializer
+    )
+    cache: dict[tuple, tuple] = {}
+
+    def map_individuals(func: Callable, individuals: list) -> list[tuple]:
+        """
+        Evaluate settings of individuals not cached, and return fitness.
+        """
+        keys: list[tuple] = [key for key in dict.fromkeys(map(tuple, individuals)) if key not in cache]
+        results: Iterator[tuple] = pool.map(
+            evaluate_func,
+            [dict(key) for key in keys],
+            chunksize=get_chunk_size(len(keys), max_workers)
+        )
+        cache.update(zip(keys, results, strict=True))
+
+        return [func(individual) for individual in individuals]
+
+    def evaluate_individual(individual: list) -> tuple[float]:
+        """"""
+        return (key_func(cache[tuple(individual)]),)
+
+    # Individual class is created in vnpy.trader.optimize
+    toolbox: base.Toolbox = base.Toolbox()
+    toolbox.register("individual", tools.initIterate, creator.Individual, generate_parameter)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("mate", tools.cxTwoPoint)
+    toolbox.register("mutate", mutate_individual, indpb=indpb)
+    toolbox.register("select", tools.selNSGA2)
+    toolbox.register("map", map_individuals)
+    toolbox.register("evaluate", evaluate_individual)
+
+    if mu is None:
+        mu = int(pop_size * 0.8)
+
+    if lambda_ is None:
+        lambda_ = pop_size
+
+    if mutpb is None:
+        mutpb = 1.0 - cxpb
+
+    output(_("开始执行遗传算法优化"))
+    output(_("参数优化空间：{}").format(get_setting_count(optimization_setting)))
+    output(_("每代族群总数：{}").format(pop_size))
+    output(_("优良筛选个数：{}").format(mu))
+    output(_("迭代次数：{}").format(ngen))
+    output(_("交叉概率：{:.0%}").format(cxpb))
+    output(_("突变概率：{:.0%}").format(mutpb))
+    output(_("个体突变概率：{:.0%}").format(indpb))
+
+    start: float = perf_counter()
+
+    with pool:
+        algorithms.eaMuPlusLambda(
+            toolbox.population(pop_size),
+            toolbox,
+            mu,
+            lambda_,
+            cxpb,
+            mutpb,
+            ngen,
+            verbose=True
+        )
+
+    end: float = perf_counter()
+    cost: int = int(end - start)
+    output(_("遗传算法优化完成，耗时{}秒").format(cost))
+
+    results: list[tuple] = list(cache.values())
+    results.sort(reverse=True, key=key_func)
+    return results
+
+
+class GaussianProcess:
+    """
+    Gaussian process regression with RBF kernel, on points scaled into
+    [0, 1]. Length scale is selected by maximum marginal likelihood.
+    """
+
+    def __init__(self, noise: float = 1e-4) -> None:
+        """"""
+        self.noise: float = noise
+        self.length_scale: float = LENGTH_SCALES[0]
+
+        self.x: np.ndarray = np.empty((0, 0))
+        self.y_mean: float = 0
+        self.y_std: float = 1
+        self.cholesky: np.ndarray = np.empty((0, 0))
+        self.alpha: np.ndarray = np.empty(0)
+
+    def calculate_kernel(self, x1: np.ndarray, x2: np.ndarray) -> np.ndarray:
+        """"""
+        distance: np.ndarray = (
+            (x1 ** 2).sum(axis=1)[:, None]
+            + (x2 ** 2).sum(axis=1)[None, :]
+            - 2 * x1 @ x2.T
+        )
+        result: np.ndarray = np.exp(-0.5 * np.maximum(distance, 0) / self.length_scale ** 2)
+        return result
+
+    def fit(self, x: np.ndarray, y: np.ndarray, select: bool = True) -> None:
+        """
+        Fit model with observed points and values. Length scale is kept
+        unchanged if select is False.
+        """
+        self.x = x
+        self.y_mean = float(y.mean())
+        self.y_std = float(y.std()) or 1
+        y = (y - self.y_mean) / self.y_std
+
+        length_scales: tuple[float, ...] = LENGTH_SCALES if select else (self.length_scale,)
+        best_likelihood: float = -np.inf
+
+        for length_scale in length_scales:
+            self.length_scale = length_scale
+
+            kernel: np.ndarray = self.calculate_kernel(x, x)
+            kernel[np.diag_indices_from(kernel)] += self.noise
+            cholesky: np.ndarray = np.linalg.cholesky(kernel)
+            alpha: np.ndarray = np.linalg.solve(cholesky.T, np.linalg.solve(cholesky, y))
+
+            likelihood: float = float(-0.5 * y @ alpha - np.log(np.diag(cholesky)).sum())
+            if likelihood > best_likelihood:
+                best_likelihood = likelihood
+                best: tuple = (length_scale, cholesky, alpha)
+
+        self.length_scale, self.cholesky, self.alpha = best
+
+    def predict(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return mean and standard deviation of prediction at points.
+        """
+        kernel: np.ndarray = self.calculate_kernel(x, self.x)
+        mean: np.ndarray = kernel @ self.alpha
+
+        v: np.ndarray = np.linalg.solve(self.cholesky, kernel.T)
+        variance: np.ndarray = np.maximum(1 - (v ** 2).sum(axis=0), 1e-12)
+
+        return mean * self.y_std + self.y_mean, np.sqrt(variance) * self.y_std
+
+
+def calculate_expected_improvement(mean: np.ndarray, std: np.ndarray, best: float) -> np.ndarray:
+    """
+    Calculate expected improvement over best value found.
+    """
+    z: np.ndarray = (mean - best) / std
+    cdf: np.ndarray = 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+    pdf: np.ndarray = np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+
+    result: np.ndarray = (mean - best) * cdf + std * pdf
+    return result
+
+
+def propose_settings(
+    model: GaussianProcess,
+    points: np.ndarray,
+    observed: list[int],
+    values: list[float],
+    count: int,
+    rng: np.random.Generator
+) -> list[int]:
+    """
+    Return index of next batch of points with most expected improvement.
+
+    Only a random sample of MAX_CANDIDATE_COUNT unevaluated points is
+    scored if there are more. After each point is chosen, its predicted
+    mean is added as observed value, so following points are chosen away
+    from it.
+    """
+    observed = list(observed)
+    values = list(values)
+    available: np.ndarray = np.ones(len(points), dtype=bool)
+    available[observed] = False
+
+    candidates: np.ndarray = np.flatnonzero(available)
+    if len(candidates) > MAX_CANDIDATE_COUNT:
+        candidates = rng.choice(candidates, MAX_CANDIDATE_COUNT, replace=False)
+
+    proposed: list[int] = []
+    best: float = max(values)
+
+    for i in range(min(count, len(candidates))):
+        model.fit(points[observed], np.array(values), select=(i == 0))
+
+        mean, std = model.predict(points[candidates])
+        improvement: np.ndarray = calculate_expected_improvement(mean, std, best)
+
+        j: int = int(improvement.argmax())
+        ix: int = int(candidates[j])
+
+        proposed.append(ix)
+        candidates = np.delete(candidates, j)
+        observed.append(ix)
+        values.append(float(mean[j]))
+
+    return proposed
+
+
+def run_bayes_optimization(
+    evaluate_func: EVALUATE_FUNC,
+    optimization_setting: OptimizationSetting,
+    key_func: KEY_FUNC,
+    max_workers: int | None = None,
+    output: OUTPUT_FUNC = print,
+    initializer: Callable | None = None,
+    max_count: int = 0,
+    init_count: int = 0,
+    seed: int | None = None,
+    constraints: list[CONSTRAINT_FUNC] | None = None
+) -> list[tuple]:
+    """
+    Run Bayesian optimization with Gaussian process surrogate model.
+
+    Random settings are evaluated first, then each batch of settings is
+    proposed by expected improvement of the model fitted with all finished
+    results. Batch size is the number of workers, and optimization stops
+    after max_count settings evaluated, which is 10% of all settings and
+    no more than MAX_BAYES_COUNT by default.
+    """
+    settings: list[dict] = list(generate_settings(optimization_setting, constraints))
+    if not settings:
+        output(_("没有满足参数约束的参数组合"))
+        return []
+
+    # Scale parameter values into [0, 1] by position in value list
+    positions: dict[str, dict[Any, float]] = {
+        name: {value: i / max(len(values) - 1, 1) for i, value in enumerate(values)}
+        for name, values in optimization_setting.params.items()
+    }
+    points: np.ndarray = np.array([
+        [positions[name][value] for name, value in setting.items()]
+        for setting in settings
+    ], dtype=float)
+
+    batch_size: int = max_workers or cpu_count() or 1
+    if not max_count:
+        max_count = min(max(len(settings) // 10, batch_size * 2), MAX_BAYES_COUNT)
+    max_count = min(max_count, len(settings))
+
+    if not init_count:
+        init_count = batch_size
+    init_count = min(init_count, max_count, len(settings))
+
+    output(_("开始执行贝叶斯优化"))
+    output(_("参数优化空间：{}，最大评估数量：{}").format(len(settings), max_count))
+
+    start: float = perf_counter()
+
+    rng: np.random.Generator = np.random.default_rng(seed)
+    batch: list[int] = [int(ix) for ix in rng.choice(len(settings), init_count, replace=False)]
+
+    model: GaussianProcess = GaussianProcess()
+    observed: list[int] = []
+    values: list[float] = []
+    results: list[tuple] = []
+
+    with ProcessPoolExecutor(
+        max_workers,
+        mp_context=get_context("spawn"),
+        initializer=initializer
+    ) as executor:
+        while batch:
+            for ix, result in zip(
+                batch,
+                executor.map(evaluate_func, [settings[ix] for ix in batch]),
+                strict=True
+            ):
+                value: float = key_func(result)
+
+                observed.append(ix)
+                values.append(value if math.isfinite(value) else -np.inf)
+                results.append(result)
+
+            # Replace invalid values with worst one for fitting model
+            finite: list[float] = [v for v in values if math.isfinite(v)] or [0]
+            values = [v if math.isfinite(v) else min(finite) for v in values]
+
+            output(_("已评估数量：{}，当前最优目标：{}").format(len(results), max(values)))
+
+            count: int = min(batch_size, max_count - len(results))
+            batch = propose_settings(model, points, observed, values, count, rng)
+
+    results.sort(reverse=True, key=key_func)
+
+    end: float = perf_counter()
+    cost: int = int(end - start)
+    output(_("贝叶斯优化完成，耗时{}秒").format(cost))
+
+    return results
@@ -0,0 +1,423 @@
+"""
+Backtesting statistics calculated directly from NumPy arrays.
+
+Results are the same as BacktestingEngine.calculate_statistics, without
+building any pandas object, for running a large number of backtestings in
+optimization.
+"""
+
+from datetime import date as Date
+
+import numpy as np
+
+
+STATISTICS_KEYS: list[str] = [
+    "start_date",
+    "end_date",
+    "total_days",
+    "profit_days",
+    "loss_days",
+    "capital",
+    "end_balance",
+    "max_drawdown",
+    "max_ddpercent",
+    "max_drawdown_duration",
+    "total_net_pnl",
+    "daily_net_pnl",
+    "total_commission",
+    "daily_commission",
+    "total_slippage",
+    "daily_slippage",
+    "total_turnover",
+    "daily_turnover",
+    "total_trade_count",
+    "daily_trade_count",
+    "total_return",
+    "annual_return",
+    "daily_return",
+    "return_std",
+    "sharpe_ratio",
+    "ewm_sharpe",
+    "return_drawdown_ratio",
+]
+
+
+def calculate_drawdown(balance: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return (highlevel, drawdown, ddpercent) of balance along the last axis.
+    """
+    highlevel: np.ndarray = np.maximum.accumulate(balance, axis=-1)
+    drawdown: np.ndarray = balance - highlevel
+    ddpercent: np.ndarray = drawdown / highlevel * 100
+    return highlevel, drawdown, ddpercent
+
+
+def calculate_return(balance: np.ndarray, capital: np.ndarray) -> np.ndarray:
+    """
+    Return daily log return of balance, which is 0 when balance falls below 0.
+    """
+    pre_balance: np.ndarray = np.concatenate([capital, balance[:, :-1]], axis=1)
+    x: np.ndarray = balance / pre_balance
+
+    result: np.ndarray = np.log(np.where(x > 0, x, 1))
+    return result
+
+
+def calculate_ewm_std(values: np.ndarray, half_life: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return last (mean, std) of exponentially weighted window of each row,
+    same as pandas ewm(halflife=half_life) with adjust=True and bias=False.
+    """
+    alpha: float = 1 - np.exp(np.log(0.5) / half_life)
+    weights: np.ndarray = (1 - alpha) ** np.arange(values.shape[-1] - 1, -1, -1)
+
+    weight_sum: float = weights.sum()
+    mean: np.ndarray = (weights * values).sum(axis=-1) / weight_sum
+
+    # Unbiased weighted variance
+    variance: np.ndarray = (weights * (values - mean[:, None]) ** 2).sum(axis=-1) / weight_sum
+    denominator: float = weight_sum ** 2 - (weights ** 2).sum()
+
+    if denominator > 0:
+        std: np.ndarray = np.sqrt(variance * (weight_sum ** 2 / denominator))
+    else:
+        std = np.full_like(variance, np.nan)
+
+    return mean, std
+
+
+def calculate_batch_statistics(
+    dates: list[Date],
+    net_pnl: np.ndarray,
+    commission: np.ndarray | None = None,
+    slippage: np.ndarray | None = None,
+    turnover: np.ndarray | None = None,
+    trade_count: np.ndarray | None = None,
+    capital: float | np.ndarray = 1_000_000,
+    risk_free: float | np.ndarray = 0,
+    annual_days: int | np.ndarray = 240,
+    half_life: int = 120
+) -> dict[str, np.ndarray]:
+    """
+    Calculate statistics of many backtesting results at once.
+
+    Each row of the 2-D (results x days) net_pnl array is the daily pnl
+    of one backtesting, and optional cost arrays are in the same shape.
+    Capital, risk free and annual days can be given for every row as 1-D
+    array. Return dict of statistics name and 1-D array of row values.
+    Statistics are all 0 for row with balance falling below 0, same as
+    calculate_statistics.
+    """
+    net_pnl = np.atleast_2d(np.asarray(net_pnl, dtype=float))
+    row_count, total_days = net_pnl.shape
+
+    def to_matrix(data: np.ndarray | None) -> np.ndarray:
+        if data is None:
+            return np.zeros_like(net_pnl)
+        return np.atleast_2d(data)
+
+    def to_column(data: float | np.ndarray) -> np.ndarray:
+        return np.broadcast_to(np.asarray(data, dtype=float), row_count).reshape(-1, 1)
+
+    commission = to_matrix(commission)
+    slippage = to_matrix(slippage)
+    turnover = to_matrix(turnover)
+    trade_count = to_matrix(trade_count)
+
+    capital_column: np.ndarray = to_column(capital)
+    risk_free_column: np.ndarray = to_column(risk_free)
+    annual_days_column: np.ndarray = to_column(annual_days)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balance: np.ndarray = np.cumsum(net_pnl, axis=1) + capital_column
+
+        # All balance value needs to be positive
+        valid: np.ndarray = (balance > 0).all(axis=1) & (total_days > 0)
+        # Avoid reduction on empty array
+        if not total_days:
+            balance = np.ones((row_count, 1))
+
+        returns: np.ndarray = calculate_return(balance, capital_column)
+        highlevel, drawdown, ddpercent = calculate_drawdown(balance)
+
+        profit_days: np.ndarray = (net_pnl > 0).sum(axis=1)
+        loss_days: np.ndarray = (net_pnl < 0).sum(axis=1)
+
+        end_balance: np.ndarray = balance[:, -1]
+        max_drawdown: np.ndarray = drawdown.min(axis=1)
+        max_ddpercent: np.ndarray = ddpercent.min(axis=1)
+
+        # Drawdown starts from highest balance before max drawdown
+        max_drawdown_end: np.ndarray = drawdown.argmin(axis=1)
+        before_end: np.ndarray = np.arange(balance.shape[1]) <= max_drawdown_end[:, None]
+        max_drawdown_start: np.ndarray = np.where(before_end, balance, -np.inf).argmax(axis=1)
+
+        ordinals: np.ndarray = np.array([d.toordinal() for d in dates] or [0])
+        max_drawdown_duration: np.ndarray = ordinals[max_drawdown_end] - ordinals[max_drawdown_start]
+
+        total_net_pnl: np.ndarray = net_pnl.sum(axis=1)
+        total_commission: np.ndarray = commission.sum(axis=1)
+        total_slippage: np.ndarray = slippage.sum(axis=1)
+        total_turnover: np.ndarray = turnover.sum(axis=1)
+        total_trade_count: np.ndarray = trade_count.sum(axis=1)
+
+        total_return: np.ndarray = (end_balance / capital_column[:, 0] - 1) * 100
+        annual_return: np.ndarray = total_return / total_days * annual_days_column[:, 0]
+        daily_return: np.ndarray = returns.mean(axis=1) * 100
+
+        if total_days > 1:
+            return_std: np.ndarray = returns.std(axis=1, ddof=1) * 100
+        else:
+            return_std = np.full(row_count, np.nan)
+
+        sqrt_days: np.ndarray = np.sqrt(annual_days_column[:, 0])
+        daily_risk_free: np.ndarray = risk_free_column[:, 0] / sqrt_days
+        sharpe_ratio: np.ndarray = (daily_return - daily_risk_free) / return_std * sqrt_days
+
+        ewm_mean, ewm_std = calculate_ewm_std(returns, half_life)
+        ewm_sharpe: np.ndarray = (ewm_mean * 100 - daily_risk_free) / (ewm_std * 100) * sqrt_days
+
+        return_drawdown_ratio: np.ndarray = -total_return / max_ddpercent
+
+    sharpe_ratio[return_std == 0] = 0
+    ewm_sharpe[return_std == 0] = 0
+    return_drawdown_ratio[max_ddpercent == 0] = 0
+
+    date_array: np.ndarray = np.empty(row_count, dtype=object)
+    date_array[:] = ""
+    start_date: np.ndarray = date_array.copy()
+    end_date: np.ndarray = date_array.copy()
+    if total_days:
+        start_date[valid] = dates[0]
+        end_date[valid] = dates[-1]
+
+    statistics: dict[str, np.ndarray] = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_days": np.full(row_count, total_days),
+        "profit_days": profit_days,
+        "loss_days": loss_days,
+        "capital": capital_column[:, 0],
+        "end_balance": end_balance,
+        "max_drawdown": max_drawdown,
+        "max_ddpercent": max_ddpercent,
+        "max_drawdown_duration": max_drawdown_duration,
+        "total_net_pnl": total_net_pnl,
+        "daily_net_pnl": total_net_pnl / max(total_days, 1),
+        "total_commission": total_commission,
+        "daily_commission": total_commission / max(total_days, 1),
+        "total_slippage": total_slippage,
+        "daily_slippage": total_slippage / max(total_days, 1),
+        "total_turnover": total_turnover,
+        "daily_turnover": total_turnover / max(total_days, 1),
+        "total_trade_count": total_trade_count,
+        "daily_trade_count": total_trade_count / max(total_days, 1),
+        "total_return": total_return,
+        "annual_return": annual_return,
+        "daily_return": daily_return,
+        "return_std": return_std,
+        "sharpe_ratio": sharpe_ratio,
+        "ewm_sharpe": ewm_sharpe,
+        "return_drawdown_ratio": return_drawdown_ratio,
+    }
+
+    # Set statistics of rows with balance below 0 to default value,
+    # and filter potential error infinite value
+    for key, value in statistics.items():
+        if key in {"start_date", "end_date", "capital"}:
+            continue
+
+        value = np.where(valid, value, 0)
+        value[np.isinf(value)] = 0
+        statistics[key] = np.nan_to_num(value)
+
+    return statistics
+
+
+def calculate_statistics(
+    dates: list[Date],
+    net_pnl: np.ndarray,
+    commission: np.ndarray,
+    slippage: np.ndarray,
+    turnover: np.ndarray,
+    trade_count: np.ndarray,
+    capital: float,
+    risk_free: float,
+    annual_days: int,
+    half_life: int
+) -> dict:
+    """
+    Calculate statistics of daily backtesting result.
+    """
+    results: dict[str, np.ndarray] = calculate_batch_statistics(
+        dates,
+        net_pnl,
+        commission,
+        slippage,
+        turnover,
+        trade_count,
+        capital,
+        risk_free,
+        annual_days,
+        half_life
+    )
+
+    statistics: dict = {key: results[key][0] for key in STATISTICS_KEYS}
+    statistics["capital"] = capital
+    return statistics
+
+
+def get_block_index(
+    day_count: int,
+    sample_count: int,
+    block_size: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Return (samples x days) index of circular block bootstrap, made of
+    blocks of consecutive days starting from random days.
+    """
+    block_count: int = -(-day_count // block_size)
+    starts: np.ndarray = rng.integers(0, day_count, (sample_count, block_count))
+
+    index: np.ndarray = (starts[:, :, None] + np.arange(block_size)) % day_count
+    return index.reshape(sample_count, -1)[:, :day_count]
+
+
+def get_permutation_index(
+    segment_starts: np.ndarray,
+    day_count: int,
+    sample_count: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Return (samples x days) index of days with segments concatenated in
+    random order. Each segment is a sequence of consecutive days starting
+    from segment start.
+    """
+    lengths: np.ndarray = np.diff(np.append(segment_starts, day_count))
+
+    orders: np.ndarray = rng.random((sample_count, len(segment_starts))).argsort(axis=1)
+    sorted_starts: np.ndarray = segment_starts[orders]
+    sorted_lengths: np.ndarray = lengths[orders]
+
+    # Position of each segment in the new sequence
+    positions: np.ndarray = np.cumsum(sorted_lengths, axis=1) - sorted_lengths
+
+    index: np.ndarray = np.repeat(
+        (sorted_starts - positions).ravel(),
+        sorted_lengths.ravel()
+    ) + np.tile(np.arange(day_count), sample_count)
+    return index.reshape(sample_count, day_count)
+
+
+def calculate_bootstrap_statistics(
+    method: str,
+    data: dict,
+    sample_count: int,
+    block_size: int,
+    seed: np.random.SeedSequence,
+    capital: float,
+    risk_free: float,
+    annual_days: int,
+    half_life: int
+) -> dict[str, np.ndarray]:
+    """
+    Resample daily result and calculate statistics of every sample.
+
+    With "block" method, blocks of daily results are drawn at random with
+    replacement. With "trade" method, daily results are split into
+    segments starting from each day with trade, and the order of segments
+    is shuffled.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    day_count: int = len(data["date"])
+
+    if method == "trade":
+        segment_starts: np.ndarray = np.flatnonzero(data["trade_count"])
+        if not len(segment_starts) or segment_starts[0]:
+            segment_starts = np.append(0, segment_starts)
+
+        index: np.ndarray = get_permutation_index(segment_starts, day_count, sample_count, rng)
+    else:
+        index = get_block_index(day_count, sample_count, block_size, rng)
+
+    return calculate_batch_statistics(
+        data["date"],
+        data["net_pnl"][index],
+        data["commission"][index],
+        data["slippage"][index],
+        data["turnover"][index],
+        data["trade_count"][index],
+        capital,
+        risk_free,
+        annual_days,
+        half_life
+    )
+
+
+def match_round_trips(volume: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Match trades into round trips with FIFO rule.
+
+    Volume of each trade is positive for long and negative for short.
+    Trade reversing position is split into closing and opening part, then
+    the n-th unit of closing volume is matched with the n-th unit of
+    opening volume. Return (open index, close index, volume) of matched
+    trade pairs.
+    """
+    pos: np.ndarray = np.cumsum(volume)
+    pre_pos: np.ndarray = pos - volume
+
+    # Trade in opposite direction of position closes the position first
+    close_volume: np.ndarray = np.where(
+        pre_pos * volume < 0,
+        np.minimum(np.abs(volume), np.abs(pre_pos)),
+        0
+    )
+    open_volume: np.ndarray = np.abs(volume) - close_volume
+
+    open_total: np.ndarray = np.cumsum(open_volume)
+    close_total: np.ndarray = np.cumsum(close_volume)
+
+    if not len(close_total) or not close_total[-1]:
+        empty: np.ndarray = np.zeros(0, dtype=int)
+        return empty, empty, np.zeros(0)
+
+    # Split closed volume at every boundary of open and close trades
+    bounds: np.ndarray = np.unique(np.concatenate([[0], open_total, close_total]))
+    bounds = bounds[bounds <= close_total[-1]]
+
+    starts: np.ndarray = bounds[:-1]
+    match_volume: np.ndarray = np.diff(bounds)
+
+    open_ix: np.ndarray = np.searchsorted(open_total, starts, side="right")
+    close_ix: np.ndarray = np.searchsorted(close_total, starts, side="right")
+
+    return open_ix, close_ix, match_volume
+
+
+def calculate_range_extremum(
+    values: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    func: np.ufunc
+) -> np.ndarray:
+    """
+    Return max or min (by np.maximum or np.minimum func) of values in
+    every range from start to end (included).
+
+    Values are reduced only inside ranges and gaps between them with
+    reduceat, so no table of values size is created.
+    """
+    if not len(starts):
+        return np.zeros(0)
+
+    # Reduce [start, end + 1) at even positions, with end index kept
+    # valid for range ending at the last value
+    indices: np.ndarray = np.empty(len(starts) * 2, dtype=np.intp)
+    indices[0::2] = starts
+    indices[1::2] = np.minimum(ends + 1, len(values) - 1)
+
+    result: np.ndarray = func(func.reduceat(values, indices)[0::2], values[ends])
+    return result
@@ -26,6 +26,15 @@ class DoubleMaStrategy(CtaTemplate):
     parameters = ["fast_window", "slow_window"]
     variables = ["fast_ma0", "fast_ma1", "slow_ma0", "slow_ma1"]
 
+    @classmethod
+    def check_setting(cls, setting: dict) -> bool:
+        """
+        Fast window must be shorter than slow window.
+        """
+        fast_window: int = setting.get("fast_window", cls.fast_window)
+        slow_window: int = setting.get("slow_window", cls.slow_window)
+        return fast_window < slow_window
+
     def on_init(self) -> None:
         """
         Callback when strategy is inited.
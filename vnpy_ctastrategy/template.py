@@ -59,6 +59,14 @@ class CtaTemplate(ABC):
             class_parameters[name] = getattr(cls, name)
         return class_parameters
 
+    @classmethod
+    def check_setting(cls, setting: dict) -> bool:
+        """
+        Check whether parameter setting is valid, settings failing check
+        are skipped in optimization.
+        """
+        return True
+
     def get_parameters(self) -> dict:
         """
         Get strategy parameters dict.
@@ -283,6 +291,17 @@ class CtaTemplate(ABC):
         """
         return cast(int, self.cta_engine.get_size(self))
 
+    def get_indicator(self, bar: BarData, name: str, *args: Any) -> Any:
+        """
+        Return cached indicator value of the bar, only available in
+        backtesting (None is returned when not available).
+
+        Values are calculated over the whole history data, so indicators
+        like atr and rsi are not drop-in replacements for values from
+        ArrayManager of latest 100 bars.
+        """
+        return self.cta_engine.get_indicator(self, bar, name, *args)
+
     def load_bar(
         self,
         days: int,
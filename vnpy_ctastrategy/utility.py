@@ -0,0 +1,462 @@
+"""
+Incremental technical indicators and ring buffer time series container
+for CTA strategies.
+
+Each indicator is updated with the latest bar in O(1) time, instead of
+recalculating over the whole ArrayManager window. Values are the same as
+TA-Lib calculated over the full series once the indicator is inited, up to
+floating point rounding of running sums.
+
+ArrayManager recalculates on its latest window only, so ATR and RSI from
+it restart Wilder smoothing at the start of window, while the indicators
+here are smoothed over the whole history. Strategies switched from
+ArrayManager to these indicators should expect slightly different signals,
+so the bundled strategies keep using ArrayManager to leave backtesting
+results unchanged.
+"""
+
+from collections import deque
+from math import sqrt
+from typing import Any
+
+import numpy as np
+
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import ArrayManager
+
+
+class RollingWindow:
+    """
+    Fixed size window of values with running sum and sum of squares.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        self.n: int = n
+        self.count: int = 0
+        self.values: deque[float] = deque(maxlen=n)
+
+        self.total: float = 0
+        self.total_square: float = 0
+
+    @property
+    def inited(self) -> bool:
+        """
+        Return whether the window is full.
+        """
+        return self.count >= self.n
+
+    def update(self, value: float) -> None:
+        """
+        Push new value into window.
+        """
+        if len(self.values) == self.n:
+            old: float = self.values[0]
+            self.total -= old
+            self.total_square -= old * old
+
+        self.values.append(value)
+        self.count += 1
+
+        # Resum once per window length to stop floating error accumulation
+        if not self.count % self.n:
+            self.total = sum(self.values)
+            self.total_square = sum(v * v for v in self.values)
+        else:
+            self.total += value
+            self.total_square += value * value
+
+    def mean(self) -> float:
+        """
+        Return mean value of window.
+        """
+        return self.total / self.n
+
+    def std(self) -> float:
+        """
+        Return population standard deviation of window.
+        """
+        mean: float = self.total / self.n
+        variance: float = self.total_square / self.n - mean * mean
+
+        # Same zero check as TA-Lib STDDEV
+        if variance < 0.00000001:
+            return 0
+        return sqrt(variance)
+
+
+class SmaIndicator:
+    """
+    Simple moving average.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        self.window: RollingWindow = RollingWindow(n)
+        self.inited: bool = False
+        self.value: float = 0
+
+    def update(self, value: float) -> float:
+        """
+        Update with new value and return latest SMA.
+        """
+        window: RollingWindow = self.window
+        window.update(value)
+
+        if window.inited:
+            self.inited = True
+            self.value = window.mean()
+
+        return self.value
+
+
+class BollIndicator:
+    """
+    Bollinger Channel.
+    """
+
+    def __init__(self, n: int, dev: float) -> None:
+        """"""
+        self.dev: float = dev
+        self.window: RollingWindow = RollingWindow(n)
+        self.inited: bool = False
+
+        self.up: float = 0
+        self.down: float = 0
+
+    def update(self, value: float) -> tuple[float, float]:
+        """
+        Update with new close price and return latest (up, down).
+        """
+        window: RollingWindow = self.window
+        window.update(value)
+
+        if window.inited:
+            self.inited = True
+
+            mid: float = window.mean()
+            std: float = window.std()
+            self.up = mid + std * self.dev
+            self.down = mid - std * self.dev
+
+        return self.up, self.down
+
+
+class RsiIndicator:
+    """
+    Relative Strenght Index (RSI) with Wilder smoothing.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        self.n: int = n
+        self.count: int = 0
+        self.inited: bool = False
+        self.value: float = 0
+
+        self.pre_close: float = 0
+        self.avg_gain: float = 0
+        self.avg_loss: float = 0
+
+    def update(self, value: float) -> float:
+        """
+        Update with new close price and return latest RSI.
+        """
+        self.count += 1
+        if self.count == 1:
+            self.pre_close = value
+            return self.value
+
+        diff: float = value - self.pre_close
+        self.pre_close = value
+
+        n: int = self.n
+
+        # Sum price change of first n bars as seed value
+        if not self.inited:
+            if diff < 0:
+                self.avg_loss -= diff
+            else:
+                self.avg_gain += diff
+
+            if self.count <= n:
+                return self.value
+
+            self.avg_gain /= n
+            self.avg_loss /= n
+            self.inited = True
+        else:
+            self.avg_loss *= (n - 1)
+            self.avg_gain *= (n - 1)
+
+            if diff < 0:
+                self.avg_loss -= diff
+            else:
+                self.avg_gain += diff
+
+            self.avg_loss /= n
+            self.avg_gain /= n
+
+        total: float = self.avg_gain + self.avg_loss
+        if -0.00000001 < total < 0.00000001:
+            self.value = 0
+        else:
+            self.value = 100 * (self.avg_gain / total)
+
+        return self.value
+
+
+class AtrIndicator:
+    """
+    Average True Range (ATR) with Wilder smoothing.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        self.n: int = n
+        self.count: int = 0
+        self.inited: bool = False
+        self.value: float = 0
+
+        self.pre_close: float = 0
+        self.total: float = 0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """
+        Update with new bar prices and return latest ATR.
+        """
+        self.count += 1
+        pre_close: float = self.pre_close
+        self.pre_close = close
+
+        if self.count == 1:
+            return self.value
+
+        true_range: float = max(high, pre_close) - min(low, pre_close)
+
+        n: int = self.n
+
+        # Average true range of first n bars as seed value
+        if not self.inited:
+            self.total += true_range
+
+            if self.count <= n:
+                return self.value
+
+            self.value = self.total / n
+            self.inited = True
+        else:
+            self.value = (self.value * (n - 1) + true_range) / n
+
+        return self.value
+
+
+class CciIndicator:
+    """
+    Commodity Channel Index (CCI).
+
+    The mean deviation term needs every typical price inside the window,
+    which is calculated with a single NumPy operation on a ring buffer.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        self.n: int = n
+        self.count: int = 0
+        self.inited: bool = False
+        self.value: float = 0
+
+        self.buffer: np.ndarray = np.zeros(n)
+        self.window: RollingWindow = RollingWindow(n)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """
+        Update with new bar prices and return latest CCI.
+        """
+        typical_price: float = (high + low + close) / 3
+
+        self.buffer[self.count % self.n] = typical_price
+        self.count += 1
+
+        window: RollingWindow = self.window
+        window.update(typical_price)
+
+        if not window.inited:
+            return self.value
+        self.inited = True
+
+        mean: float = window.mean()
+        deviation: float = float(np.abs(self.buffer - mean).sum())
+        diff: float = typical_price - mean
+
+        if diff and deviation:
+            self.value = diff / (0.015 * (deviation / self.n))
+        else:
+            self.value = 0
+
+        return self.value
+
+
+class KeltnerIndicator:
+    """
+    Keltner Channel.
+    """
+
+    def __init__(self, n: int, dev: float) -> None:
+        """"""
+        self.dev: float = dev
+        self.sma: SmaIndicator = SmaIndicator(n)
+        self.atr: AtrIndicator = AtrIndicator(n)
+        self.inited: bool = False
+
+        self.up: float = 0
+        self.down: float = 0
+
+    def update(self, high: float, low: float, close: float) -> tuple[float, float]:
+        """
+        Update with new bar prices and return latest (up, down).
+        """
+        mid: float = self.sma.update(close)
+        atr: float = self.atr.update(high, low, close)
+
+        if self.atr.inited:
+            self.inited = True
+            self.up = mid + atr * self.dev
+            self.down = mid - atr * self.dev
+
+        return self.up, self.down
+
+
+class DonchianIndicator:
+    """
+    Donchian Channel with monotonic deques for rolling max and min.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        self.n: int = n
+        self.count: int = 0
+        self.inited: bool = False
+
+        self.high_queue: deque[tuple[int, float]] = deque()
+        self.low_queue: deque[tuple[int, float]] = deque()
+
+        self.up: float = 0
+        self.down: float = 0
+
+    def update(self, high: float, low: float) -> tuple[float, float]:
+        """
+        Update with new bar prices and return latest (up, down).
+        """
+        ix: int = self.count
+        self.count += 1
+
+        high_queue: deque[tuple[int, float]] = self.high_queue
+        while high_queue and high_queue[-1][1] <= high:
+            high_queue.pop()
+        high_queue.append((ix, high))
+
+        low_queue: deque[tuple[int, float]] = self.low_queue
+        while low_queue and low_queue[-1][1] >= low:
+            low_queue.pop()
+        low_queue.append((ix, low))
+
+        # Drop values moved out of window
+        start: int = ix - self.n + 1
+        if high_queue[0][0] < start:
+            high_queue.popleft()
+        if low_queue[0][0] < start:
+            low_queue.popleft()
+
+        if self.count >= self.n:
+            self.inited = True
+            self.up = high_queue[0][1]
+            self.down = low_queue[0][1]
+
+        return self.up, self.down
+
+
+class RingSeries:
+    """
+    Descriptor returning contiguous view of one series in RingArrayManager.
+    """
+
+    def __init__(self, row: int) -> None:
+        """"""
+        self.row: int = row
+
+    def __get__(self, obj: Any, objtype: type | None = None) -> Any:
+        """
+        Return latest values in time order, without copying data.
+        """
+        if obj is None:
+            return self
+
+        ix: int = obj.ix
+        return obj.buffer[self.row, ix:ix + obj.size]
+
+    def __set__(self, obj: Any, value: np.ndarray) -> None:
+        """
+        Overwrite all values of the series.
+        """
+        ix: int = obj.ix
+        size: int = obj.size
+        row: np.ndarray = obj.buffer[self.row]
+
+        row[ix:ix + size] = value
+        row[:ix] = row[size:size + ix]
+        row[ix + size:] = row[ix:size]
+
+
+class RingArrayManager(ArrayManager):
+    """
+    ArrayManager variant with ring buffer storage.
+
+    Every value is written twice into a buffer of double size, so the
+    latest values are always a contiguous slice of the buffer. Bar update
+    writes in place instead of shifting every array, and indicator
+    functions receive the same arrays as from ArrayManager.
+    """
+
+    open_array: np.ndarray = RingSeries(0)                  # type: ignore
+    high_array: np.ndarray = RingSeries(1)                  # type: ignore
+    low_array: np.ndarray = RingSeries(2)                   # type: ignore
+    close_array: np.ndarray = RingSeries(3)                 # type: ignore
+    volume_array: np.ndarray = RingSeries(4)                # type: ignore
+    turnover_array: np.ndarray = RingSeries(5)              # type: ignore
+    open_interest_array: np.ndarray = RingSeries(6)         # type: ignore
+
+    def __init__(self, size: int = 100) -> None:
+        """Constructor"""
+        self.count: int = 0
+        self.size: int = size
+        self.inited: bool = False
+
+        # Position of the oldest value, which will be overwritten next
+        self.ix: int = 0
+        self.buffer: np.ndarray = np.zeros((7, size * 2))
+
+    def update_bar(self, bar: BarData) -> None:
+        """
+        Update new bar data into array manager.
+        """
+        self.count += 1
+        if not self.inited and self.count >= self.size:
+            self.inited = True
+
+        ix: int = self.ix
+        values: tuple = (
+            bar.open_price,
+            bar.high_price,
+            bar.low_price,
+            bar.close_price,
+            bar.volume,
+            bar.turnover,
+            bar.open_interest
+        )
+
+        buffer: np.ndarray = self.buffer
+        buffer[:, ix] = values
+        buffer[:, ix + self.size] = values
+
+        self.ix = (ix + 1) % self.size